@@ -27,6 +27,8 @@ export const ChatErrorType = {
   Forbidden: 403,
   ContentNotFound: 404, // 没找到接口
   MethodNotAllowed: 405, // 不支持
+  PayloadTooLarge: 413,
+  UnsupportedMediaType: 415,
   TooManyRequests: 429,
 
   // ******* 服务端错误 ******* //InvalidPluginArgumentsTransform
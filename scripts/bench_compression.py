@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+压缩传输基准：对比角色列表下载与聊天请求体上传在不压缩 / gzip / br 下的字节数与耗时。
+- roles_get：实际请求 GET /webapi/roles（分别声明 identity / gzip / br），记录线上字节数、实测耗时，
+  并按给定的下行带宽与 RTT 估算受限网络上的耗时；服务端不可达时改用本地 roles.json 离线计算
+- chat_upload：用角色描述拼出系统提示词，加上 N 轮长中文历史构造聊天请求体（不实际发送，避免消耗 token），
+  按给定的上行带宽估算上传耗时（含压缩 CPU 时间）
+- br 需要安装 brotli（pip install brotli），未安装时跳过
+
+使用示例：
+  python scripts/bench_compression.py --base http://localhost:3020 --uplink-kbps 256 --downlink-kbps 2000 --rtt-ms 80
+  python scripts/bench_compression.py --offline --history-turns 40
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import os
+import statistics
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from py_role_chat import build_system_prompt, encode_body
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_FILE = "src/storage/roles.json"
+# 历史消息的填充文本：与真实对话相近的长中文段落
+FILLER = "你好，我想了解一下这个角色的背景故事，以及它在不同场景下会如何回应用户提出的问题。请尽量详细地说明。"
+
+
+def _codecs() -> Dict[str, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]]:
+    codecs: Dict[str, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+        "identity": (lambda b: b, lambda b: b),
+        "gzip": (lambda b: gzip.compress(b, compresslevel=6), gzip.decompress),
+    }
+    if brotli is not None:
+        codecs["br"] = (lambda b: brotli.compress(b, quality=5, mode=brotli.MODE_TEXT), brotli.decompress)
+    return codecs
+
+
+def _timed(fn: Callable[[bytes], bytes], data: bytes, repeat: int) -> Tuple[bytes, float]:
+    """返回 (结果, 中位耗时毫秒)。"""
+    samples: List[float] = []
+    out = data
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(data)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return out, statistics.median(samples)
+
+
+def link_ms(nbytes: int, kbps: float, rtt_ms: float) -> float:
+    """在带宽为 kbps、往返时延为 rtt_ms 的链路上传输 nbytes 的估算耗时（不含慢启动）。"""
+    return rtt_ms + nbytes * 8 / (kbps * 1000) * 1000
+
+
+# -------------------- 角色列表下载 -------------------- #
+def fetch_encoded(base: str, encoding: str, timeout: float) -> Tuple[bytes, str, float]:
+    """请求 /webapi/roles，返回 (线上原始字节, 实际 Content-Encoding, 耗时毫秒)。"""
+    req = urllib.request.Request(f"{base}/webapi/roles")
+    req.add_header("Accept", "application/json")
+    req.add_header("Accept-Encoding", encoding)
+    t0 = time.perf_counter()
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        raw = resp.read()
+        actual = (resp.headers.get("Content-Encoding") or "identity").lower()
+    return raw, actual, (time.perf_counter() - t0) * 1000
+
+
+def bench_roles_get(args: argparse.Namespace, roles_json: Optional[bytes]) -> Dict[str, Any]:
+    codecs = _codecs()
+    results: Dict[str, Any] = {}
+    for name, (compress, _) in codecs.items():
+        if args.offline:
+            assert roles_json is not None
+            wire, compress_ms = _timed(compress, roles_json, args.repeat)
+            measured_ms = None
+            actual = name
+        else:
+            samples: List[float] = []
+            wire, actual = b"", name
+            for _ in range(args.repeat):
+                wire, actual, ms = fetch_encoded(args.base, name, args.timeout)
+                samples.append(ms)
+            measured_ms = round(statistics.median(samples), 1)
+            compress_ms = None
+        decoded, decode_ms = _timed(codecs.get(actual, codecs["identity"])[1], wire, args.repeat)
+        results[name] = {
+            "content_encoding": actual,
+            "wire_bytes": len(wire),
+            "decoded_bytes": len(decoded),
+            "measured_ms": measured_ms,
+            "server_compress_ms": round(compress_ms, 2) if compress_ms is not None else None,
+            "client_decode_ms": round(decode_ms, 2),
+            "modeled_ms": round(link_ms(len(wire), args.downlink_kbps, args.rtt_ms) + decode_ms + (compress_ms or 0.0), 1),
+        }
+    return results
+
+
+# -------------------- 聊天请求体上传 -------------------- #
+def build_chat_payload(roles: List[Dict[str, Any]], turns: int) -> Dict[str, Any]:
+    role = max(roles, key=lambda r: len(str(r.get("description") or "")), default={})
+    messages: List[Dict[str, Any]] = []
+    prompt = build_system_prompt(role) if role else ""
+    if prompt:
+        messages.append({"role": "system", "content": prompt})
+    # 助手回复轮流取不同角色的描述，避免重复文本让压缩率虚高
+    texts = [str(r.get("description")) for r in roles if r.get("description")] or [FILLER]
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"第{i + 1}轮：{FILLER}"})
+        messages.append({"role": "assistant", "content": texts[i % len(texts)][:600]})
+    messages.append({"role": "user", "content": "继续"})
+    return {"model": "gpt-5-mini", "messages": messages, "stream": True}
+
+
+def bench_chat_upload(args: argparse.Namespace, roles: List[Dict[str, Any]]) -> Dict[str, Any]:
+    payload = build_chat_payload(roles, args.history_turns)
+    # 旧客户端使用 json.dumps 默认的 ASCII 转义，中文每字 6 字节
+    ascii_body = json.dumps(payload).encode("utf-8")
+    utf8_body, _ = encode_body(payload)
+    results: Dict[str, Any] = {
+        "ascii_escaped": {"wire_bytes": len(ascii_body), "modeled_ms": round(link_ms(len(ascii_body), args.uplink_kbps, args.rtt_ms), 1)},
+        "utf8": {"wire_bytes": len(utf8_body), "modeled_ms": round(link_ms(len(utf8_body), args.uplink_kbps, args.rtt_ms), 1)},
+    }
+    for name, (compress, _) in _codecs().items():
+        if name == "identity":
+            continue
+        wire, compress_ms = _timed(compress, utf8_body, args.repeat)
+        results[name] = {
+            "wire_bytes": len(wire),
+            "client_compress_ms": round(compress_ms, 2),
+            "modeled_ms": round(link_ms(len(wire), args.uplink_kbps, args.rtt_ms) + compress_ms, 1),
+        }
+    return results
+
+
+def _savings(results: Dict[str, Any], baseline: str) -> Dict[str, Any]:
+    base = results[baseline]
+    return {
+        name: {
+            "bytes_saved_pct": round((1 - r["wire_bytes"] / base["wire_bytes"]) * 100, 1) if base["wire_bytes"] else 0.0,
+            "modeled_ms_saved": round(base["modeled_ms"] - r["modeled_ms"], 1),
+        }
+        for name, r in results.items()
+        if name != baseline
+    }
+
+
+# -------------------- 命令行 CLI -------------------- #
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure bytes and latency saved by compressed role/chat transfers")
+    parser.add_argument("--base", default=os.environ.get("LOBECHAT_BASE", "http://localhost:3020"), help="LobeChat base URL")
+    parser.add_argument("--file", default=DEFAULT_FILE, help="roles.json used for offline mode and as the chat payload source")
+    parser.add_argument("--offline", action="store_true", help="Do not contact the server; compress the local roles.json instead")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions per measurement (median is reported), default: 5")
+    parser.add_argument("--history-turns", type=int, default=20, help="Chat history turns in the upload payload, default: 20")
+    parser.add_argument("--uplink-kbps", type=float, default=256, help="Modeled kiosk uplink bandwidth, default: 256")
+    parser.add_argument("--downlink-kbps", type=float, default=2000, help="Modeled kiosk downlink bandwidth, default: 2000")
+    parser.add_argument("--rtt-ms", type=float, default=80, help="Modeled round-trip time, default: 80")
+    parser.add_argument("--timeout", type=float, default=15, help="HTTP timeout in seconds")
+
+    args = parser.parse_args()
+    args.base = args.base.rstrip("/")
+    args.repeat = max(1, args.repeat)
+
+    roles: List[Dict[str, Any]] = []
+    roles_json: Optional[bytes] = None
+    try:
+        with open(args.file, "r", encoding="utf-8") as f:
+            roles = json.load(f)
+        roles_json = json.dumps(roles, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    except (OSError, json.JSONDecodeError) as e:
+        if args.offline:
+            print(f"[error] read {args.file} failed: {e}", file=sys.stderr)
+            return 1
+
+    if not args.offline:
+        try:
+            raw, actual, _ = fetch_encoded(args.base, "identity", args.timeout)
+            roles = json.loads(raw.decode("utf-8")) if actual == "identity" else roles
+        except (urllib.error.URLError, OSError) as e:
+            if roles_json is None:
+                print(f"[error] fetch roles failed: {e}", file=sys.stderr)
+                return 1
+            print(f"[warn] server unreachable ({e}); falling back to --offline", file=sys.stderr)
+            args.offline = True
+
+    roles_get = bench_roles_get(args, roles_json)
+    chat_upload = bench_chat_upload(args, roles if isinstance(roles, list) else [])
+    report = {
+        "mode": "offline" if args.offline else "live",
+        "link": {"uplink_kbps": args.uplink_kbps, "downlink_kbps": args.downlink_kbps, "rtt_ms": args.rtt_ms},
+        "brotli": brotli is not None,
+        "roles_get": roles_get,
+        "roles_get_savings": _savings(roles_get, "identity"),
+        "chat_upload": chat_upload,
+        "chat_upload_savings": _savings(chat_upload, "ascii_escaped"),
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量评测：按 JSONL 问题集并发地向各角色提问，用于提示词调整后的回答质量回归。
+- 输入 JSONL 每行一个对象：{"id": 可选, "role": "张三", "question": "你好", "follow_ups": ["继续"]}
+- 多个条目共享同一个 HTTP 连接池，由固定大小的线程池并发执行
+- 结果按完成顺序逐行追加写入输出 JSONL；输出文件同时作为断点：
+  再次运行时会跳过已有结果的条目，只跑尚未完成的条目（加 --retry-failed 可重跑失败条目）
+- 结束时按角色输出耗时统计（均值 / p50 / p90 / p95 / 最大值）与本次运行的 token 用量汇总
+- 请求默认以 bulk 优先级经进程内调度器排队，与同进程的交互式对话共存时自动让行（见 request_scheduler）
+
+使用示例：
+  python scripts/py_role_batch_eval.py --input questions.jsonl --out results.jsonl --workers 8
+  # 中断后原样再次执行即可续跑
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Set
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from py_role_chat import (
+    DEFAULT_BASE_URL,
+    DEFAULT_MODEL,
+    DEFAULT_PROVIDER,
+    RoleChatClient,
+    StreamError,
+    UsageTracker,
+    fetch_roles,
+    load_env_from_dotenv,
+    load_pricing,
+)
+from request_scheduler import PRIORITY_CLASSES, default_scheduler
+
+
+# -------------------- 输入与断点 -------------------- #
+def iter_items(path: str) -> Iterator[Dict[str, Any]]:
+    """逐行读取问题集；未提供 id 的条目以行号作为 id（续跑时需保持输入文件不变）。"""
+    with open(path, "r", encoding="utf-8") as f:
+        for lineno, raw in enumerate(f, 1):
+            line = raw.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                obj = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"[warn] line {lineno}: invalid JSON ({e})", file=sys.stderr)
+                continue
+            if not isinstance(obj, dict) or not obj.get("role") or not obj.get("question"):
+                print(f"[warn] line {lineno}: role and question are required", file=sys.stderr)
+                continue
+            follow_ups = obj.get("follow_ups") or []
+            yield {
+                "id": str(obj.get("id") or f"L{lineno}"),
+                "role": str(obj["role"]),
+                "question": str(obj["question"]),
+                "follow_ups": [str(x) for x in follow_ups] if isinstance(follow_ups, list) else [],
+            }
+
+
+def load_results(path: str) -> Dict[str, Dict[str, Any]]:
+    """读取已有输出；同一 id 以最后一条记录为准。"""
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for raw in f:
+                line = raw.strip()
+                if not line:
+                    continue
+                try:
+                    obj = json.loads(line)
+                except json.JSONDecodeError:
+                    # 上次运行被强杀时可能留下半行，忽略即可
+                    continue
+                if isinstance(obj, dict) and obj.get("id"):
+                    results[str(obj["id"])] = obj
+    except FileNotFoundError:
+        pass
+    return results
+
+
+# -------------------- 单条执行 -------------------- #
+class ActiveClients:
+    """记录进行中的客户端；中断时统一 cancel()，让在途条目尽快返回。"""
+
+    def __init__(self) -> None:
+        self.stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._clients: Set[RoleChatClient] = set()
+
+    def add(self, client: RoleChatClient) -> None:
+        with self._lock:
+            self._clients.add(client)
+
+    def discard(self, client: RoleChatClient) -> None:
+        with self._lock:
+            self._clients.discard(client)
+
+    def cancel_all(self) -> None:
+        self.stopping.set()
+        with self._lock:
+            clients = list(self._clients)
+        for client in clients:
+            client.cancel()
+
+
+def run_item(
+    item: Dict[str, Any],
+    args: argparse.Namespace,
+    session: requests.Session,
+    roles: List[Dict[str, Any]],
+    tracker: UsageTracker,
+    active: ActiveClients,
+) -> Dict[str, Any]:
+    client = RoleChatClient(
+        base_url=args.base,
+        provider=args.provider,
+        model=args.model,
+        user_id=args.user,
+        session=session,
+        usage=tracker,
+        session_id=item["id"],
+        priority=args.priority,
+        compress_min_bytes=args.compress_min_bytes,
+    )
+    # 角色列表只在启动时拉取一次，所有条目共用
+    client.roles_cache = roles
+
+    turns: List[Dict[str, Any]] = []
+    record: Dict[str, Any] = {
+        "id": item["id"],
+        "role": item["role"],
+        "provider": args.provider,
+        "model": args.model,
+        "turns": turns,
+    }
+    started = time.perf_counter()
+    # 先登记再检查 stopping：cancel_all() 要么能看到这个客户端，要么下面的检查能看到 stopping；
+    # 客户端的取消标记不会被 send() 清除，所以不会丢失
+    active.add(client)
+    try:
+        for question in [item["question"], *item["follow_ups"]]:
+            if active.stopping.is_set():
+                break
+            t0 = time.perf_counter()
+            answer = client.send(item["role"], question, stream=not args.no_stream, echo=False)
+            if active.stopping.is_set():
+                # 被 cancel() 截断的回复不完整，不能当作结果保存
+                break
+            turns.append(
+                {
+                    "question": question,
+                    "answer": answer,
+                    "latency_ms": round((time.perf_counter() - t0) * 1000, 1),
+                    "usage": client.last_usage,
+                }
+            )
+        record["ok"] = True
+    except Exception as e:
+        # 包括上游在流中报告的错误（StreamError），续跑时可用 --retry-failed 重跑
+        record["ok"] = False
+        record["error"] = str(e)
+        if isinstance(e, StreamError) and e.code:
+            record["error_code"] = e.code
+    finally:
+        active.discard(client)
+    if active.stopping.is_set():
+        # 中断时未跑完的条目不写入输出，续跑时会重新执行
+        record["interrupted"] = True
+    record["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return record
+
+
+# -------------------- 统计 -------------------- #
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return round(sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo), 1)
+
+
+def role_stats(results: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """按角色汇总：条目数、失败数与单轮耗时分布（毫秒）。"""
+    grouped: Dict[str, Dict[str, Any]] = {}
+    for rec in results.values():
+        g = grouped.setdefault(str(rec.get("role")), {"items": 0, "errors": 0, "latencies": []})
+        g["items"] += 1
+        if not rec.get("ok"):
+            g["errors"] += 1
+        for t in rec.get("turns") or []:
+            if isinstance(t, dict) and isinstance(t.get("latency_ms"), (int, float)):
+                g["latencies"].append(float(t["latency_ms"]))
+
+    stats: Dict[str, Dict[str, Any]] = {}
+    for role, g in sorted(grouped.items()):
+        lat = sorted(g["latencies"])
+        stats[role] = {
+            "items": g["items"],
+            "errors": g["errors"],
+            "turns": len(lat),
+            "mean_ms": round(sum(lat) / len(lat), 1) if lat else 0.0,
+            "p50_ms": _percentile(lat, 0.50),
+            "p90_ms": _percentile(lat, 0.90),
+            "p95_ms": _percentile(lat, 0.95),
+            "max_ms": lat[-1] if lat else 0.0,
+        }
+    return stats
+
+
+# -------------------- 命令行 CLI -------------------- #
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run a JSONL question set against LobeChat roles concurrently")
+    parser.add_argument("--input", required=True, help="Question set JSONL: {id?, role, question, follow_ups?}")
+    parser.add_argument("--out", required=True, help="Result JSONL (appended; also used as the resume checkpoint)")
+    parser.add_argument("--base", default=DEFAULT_BASE_URL, help="LobeChat base URL")
+    parser.add_argument("--user", default="PY_BATCH", help="User ID for auth payload")
+    parser.add_argument("--provider", default=DEFAULT_PROVIDER, help="Provider, default: openai")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Model, default: gpt-5-mini")
+    parser.add_argument("--workers", type=int, default=4, help="Number of concurrent items, default: 4")
+    parser.add_argument("--no-stream", action="store_true", help="Disable streaming")
+    parser.add_argument("--retry-failed", action="store_true", help="Also re-run items whose last result failed")
+    parser.add_argument("--report", help="Write per-role latency statistics to this JSON file")
+    parser.add_argument("--priority", default="bulk", choices=PRIORITY_CLASSES, help="Scheduler priority class, default: bulk")
+    parser.add_argument("--compress-min-bytes", type=int, default=0, help="Gzip chat request bodies at least this large (0 = off)")
+    parser.add_argument("--pricing", help="JSON file of per-model prices (USD per 1M tokens) to extend the built-in table")
+
+    args = parser.parse_args()
+    workers = max(1, args.workers)
+
+    load_env_from_dotenv()
+    # 该类别的并发上限与 --workers 一致，其余类别保持默认；调度器仍为 interactive 预留名额
+    scheduler = default_scheduler()
+    scheduler.set_cap(args.priority, workers)
+    try:
+        tracker = UsageTracker(load_pricing(args.pricing) if args.pricing else None)
+    except Exception as e:
+        print(f"[error] load pricing failed: {e}", file=sys.stderr)
+        return 1
+
+    previous = load_results(args.out)
+    done: Set[str] = {
+        rid for rid, rec in previous.items() if rec.get("ok") or not args.retry_failed
+    }
+
+    # 共享连接池：大小与并发数一致，避免连接被反复建立
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    try:
+        roles = fetch_roles(args.base.rstrip("/"), session)
+    except Exception as e:
+        print(f"[error] fetch roles failed: {e}", file=sys.stderr)
+        return 1
+
+    results = dict(previous)
+    active = ActiveClients()
+    submitted = skipped = finished = failed = interrupted = 0
+    started = time.perf_counter()
+
+    out_dir = os.path.dirname(os.path.abspath(args.out))
+    os.makedirs(out_dir, exist_ok=True)
+    with open(args.out, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=workers) as pool:
+        pending: Set[Future] = set()
+
+        def drain(block_until: int) -> None:
+            # 等待直到在途任务数不超过 block_until，并把完成的结果立即落盘
+            nonlocal pending, finished, failed, interrupted
+            while len(pending) > block_until:
+                completed, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in completed:
+                    if fut.cancelled():
+                        continue
+                    rec = fut.result()
+                    if rec.get("interrupted"):
+                        interrupted += 1
+                        continue
+                    out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                    out.flush()
+                    os.fsync(out.fileno())
+                    results[rec["id"]] = rec
+                    finished += 1
+                    if not rec.get("ok"):
+                        failed += 1
+                    status = "ok" if rec.get("ok") else f"error: {rec.get('error')}"
+                    print(f"[{finished}/{submitted}] {rec['id']} {rec['role']} {rec['latency_ms']}ms {status}", file=sys.stderr)
+
+        try:
+            for item in iter_items(args.input):
+                if item["id"] in done:
+                    skipped += 1
+                    continue
+                # 在途任务数限制为 2 倍并发，输入文件再大也不会一次性全部入队
+                drain(workers * 2 - 1)
+                pending.add(pool.submit(run_item, item, args, session, roles, tracker, active))
+                submitted += 1
+            drain(0)
+        except KeyboardInterrupt:
+            # 丢弃尚未开始的条目，中断在途请求，并把中断前已完成的结果落盘
+            pool.shutdown(wait=False, cancel_futures=True)
+            active.cancel_all()
+            drain(0)
+            print(
+                f"\n[interrupted] {finished} items saved, {interrupted} in-flight items discarded; "
+                "re-run the same command to resume",
+                file=sys.stderr,
+            )
+            return 130
+
+    summary = {
+        "input": args.input,
+        "out": args.out,
+        "submitted": submitted,
+        "skipped": skipped,
+        "finished": finished,
+        "failed": failed,
+        "elapsed_s": round(time.perf_counter() - started, 1),
+        "roles": role_stats(results),
+        # 仅统计本次运行实际发出的请求（续跑跳过的条目不计入）
+        "usage": {k: v for k, v in tracker.report().items() if k != "by_session"},
+        "scheduler": scheduler.stats(),
+    }
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    return 0 if failed == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,26 +12,44 @@
 交互式会话（流式输出）：
   python scripts/py_role_chat.py --role "张三"
   > 你好
-  ... 流式回复 ...
+  ... 流式回复 ...（Ctrl-C 或输入 /stop 可中断当前回复）
   > 继续
   ...
-  > exit
+  > /exit
 """
 from __future__ import annotations
 
 import argparse
+import asyncio
 import base64
+import gzip
 import json
 import os
+import signal
 import sys
-from typing import Any, Dict, List, Optional
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, TextIO, Tuple
 
 import requests
 
+from request_scheduler import RequestScheduler, default_scheduler
+
 SECRET_XOR_KEY = "LobeHub · LobeHub"
 DEFAULT_BASE_URL = "http://localhost:3020"
 DEFAULT_PROVIDER = "openai"
 DEFAULT_MODEL = "gpt-5-mini"
+# --provider all 时额外查询的服务商（逗号分隔）。鉴权头里带的是 OPENAI_API_KEY，
+# 因此只查用户自己配置过的服务商，不能向内置的第三方服务商列表广播
+PROVIDERS_ENV = "LOBE_PROVIDERS"
+MODEL_CACHE_TTL = 3600  # 秒；缓存新鲜期
+MODEL_CACHE_MAX_STALE = 7 * 24 * 3600  # 秒；超过新鲜期但在此之内时先返回旧数据并后台刷新
+# 这些 SSE 事件携带元数据而非正文，不输出到终端
+META_EVENTS = ("usage", "speed", "stop")
+# 不属于回复正文的事件：思考过程及其签名、搜索来源、图片
+SKIPPED_EVENTS = ("reasoning", "reasoning_signature", "flagged_reasoning_signature", "grounding", "base64_image")
 
 
 # -------------------- 自动加载 .env.local -------------------- #
@@ -112,14 +130,23 @@ def build_auth_header(user_id: str) -> Dict[str, str]:
 
 
 # -------------------- 角色辅助方法 -------------------- #
-def fetch_roles(base_url: str) -> List[Dict[str, Any]]:
+def fetch_roles(base_url: str, session: Optional[requests.Session] = None) -> List[Dict[str, Any]]:
+    """只拉取 role_id 与 name（旧版服务端会忽略 fields，返回完整列表）。"""
     url = f"{base_url}/webapi/roles"
-    r = requests.get(url, timeout=30)
+    r = (session or requests).get(url, params={"fields": "role_id,name"}, timeout=30)
     r.raise_for_status()
     data = r.json()
     return data if isinstance(data, list) else []
 
 
+def fetch_role(base_url: str, role_id: Any, session: Optional[requests.Session] = None) -> Dict[str, Any]:
+    url = f"{base_url}/webapi/roles/{role_id}"
+    r = (session or requests).get(url, timeout=30)
+    r.raise_for_status()
+    data = r.json()
+    return data if isinstance(data, dict) else {}
+
+
 def find_role_by_name(roles: List[Dict[str, Any]], name: str) -> Optional[Dict[str, Any]]:
     # exact match first
     for r in roles:
@@ -146,9 +173,368 @@ def build_system_prompt(role: Dict[str, Any]) -> str:
     return "\n".join([p for p in parts if p])
 
 
+# -------------------- 终端渲染 -------------------- #
+class StreamRenderer:
+    """
+    流式回复的终端输出缓冲：网络读取线程只把片段追加到内存，由独立线程按帧率批量写出。
+    - fps <= 0 时退化为逐片段写出并 flush（原有行为）
+    - 缓冲超过 max_bytes、或 flush_on_newline 且片段含换行时，立即唤醒写出
+    - close() 会把剩余内容全部写出，流结束或异常时都应调用
+    """
+
+    def __init__(self, out: TextIO, fps: float = 0.0, max_bytes: int = 4096, flush_on_newline: bool = False) -> None:
+        self.out = out
+        self.interval = 1.0 / fps if fps > 0 else 0.0
+        self.max_bytes = max(1, max_bytes)
+        self.flush_on_newline = flush_on_newline
+        self._buf: List[str] = []
+        self._size = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        if self.interval:
+            self._thread = threading.Thread(target=self._run, name="stream-renderer", daemon=True)
+            self._thread.start()
+
+    def write(self, text: str) -> None:
+        if not self.interval:
+            self.out.write(text)
+            self.out.flush()
+            return
+        with self._lock:
+            self._buf.append(text)
+            # 按 UTF-8 字节估算，CJK 字符约 3 字节
+            self._size += len(text.encode("utf-8"))
+            urgent = self._size >= self.max_bytes or (self.flush_on_newline and "\n" in text)
+        if urgent:
+            self._wake.set()
+
+    def _drain(self) -> None:
+        with self._lock:
+            if not self._buf:
+                return
+            text = "".join(self._buf)
+            self._buf.clear()
+            self._size = 0
+        self.out.write(text)
+        self.out.flush()
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self._drain()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None:
+            self._wake.set()
+            self._thread.join()
+        self._drain()
+
+
+# -------------------- 用量统计 -------------------- #
+# 单价：美元 / 百万 token（与 model-bank 中的定价保持一致；可用 --pricing 覆盖或补充）
+MODEL_PRICING: Dict[str, Dict[str, float]] = {
+    "gpt-5-mini": {"input": 0.25, "output": 2.0, "cached_input": 0.025},
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算：CJK 字符按 1 token/字，其余按 4 字符/token。"""
+    cjk = sum(1 for ch in text if "\u2e80" <= ch <= "\u9fff" or "\uf900" <= ch <= "\ufaff" or "\uff00" <= ch <= "\uffef")
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def estimate_usage(messages: List[Dict[str, Any]], reply: str) -> Dict[str, Any]:
+    # 每条消息约有 4 个 token 的格式开销
+    prompt = sum(estimate_tokens(str(m.get("content") or "")) + 4 for m in messages)
+    return {"prompt_tokens": prompt, "completion_tokens": estimate_tokens(reply), "cached_prompt_tokens": 0, "estimated": True}
+
+
+def normalize_usage(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """兼容 LobeChat usage 事件（totalInputTokens 等）与 OpenAI usage（prompt_tokens 等）两种字段。"""
+
+    def num(*keys: str) -> Optional[int]:
+        for k in keys:
+            v = data.get(k)
+            if isinstance(v, (int, float)):
+                return int(v)
+        return None
+
+    prompt = num("totalInputTokens", "inputTextTokens", "prompt_tokens", "input_tokens")
+    completion = num("totalOutputTokens", "outputTextTokens", "completion_tokens", "output_tokens")
+    if prompt is None and completion is None:
+        return None
+    cached = num("inputCachedTokens", "cache_read_input_tokens")
+    details = data.get("prompt_tokens_details")
+    if cached is None and isinstance(details, dict) and isinstance(details.get("cached_tokens"), (int, float)):
+        cached = int(details["cached_tokens"])
+    return {
+        "prompt_tokens": prompt or 0,
+        "completion_tokens": completion or 0,
+        "cached_prompt_tokens": cached or 0,
+        "estimated": False,
+    }
+
+
+def usage_cost(model: str, usage: Dict[str, Any], pricing: Optional[Dict[str, Dict[str, float]]] = None) -> Optional[float]:
+    price = (pricing or MODEL_PRICING).get(model)
+    if not price:
+        return None
+    cached = usage.get("cached_prompt_tokens", 0)
+    uncached = max(0, usage.get("prompt_tokens", 0) - cached)
+    cost = (
+        uncached * price.get("input", 0.0)
+        + cached * price.get("cached_input", price.get("input", 0.0))
+        + usage.get("completion_tokens", 0) * price.get("output", 0.0)
+    )
+    return round(cost / 1_000_000, 8)
+
+
+class UsageTracker:
+    """按会话 / 角色 / 模型 / 服务商累计 token、费用与耗时；可在多个客户端（线程）间共享。"""
+
+    DIMENSIONS = ("session", "role", "model", "provider")
+
+    def __init__(self, pricing: Optional[Dict[str, Dict[str, float]]] = None) -> None:
+        self.pricing = {**MODEL_PRICING, **(pricing or {})}
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Dict[str, Dict[str, Any]]] = {d: {} for d in self.DIMENSIONS}
+
+    def record(self, keys: Dict[str, str], usage: Dict[str, Any], latency_ms: float, ttft_ms: Optional[float]) -> Optional[float]:
+        cost = usage_cost(keys.get("model", ""), usage, self.pricing)
+        with self._lock:
+            for dim in self.DIMENSIONS:
+                t = self._totals[dim].setdefault(
+                    keys.get(dim, ""),
+                    {
+                        "requests": 0,
+                        "estimated_requests": 0,
+                        "prompt_tokens": 0,
+                        "completion_tokens": 0,
+                        "cached_prompt_tokens": 0,
+                        "cost_usd": 0.0,
+                        "unpriced_requests": 0,
+                        "latency_ms": 0.0,
+                        "ttft_ms": 0.0,
+                        "ttft_samples": 0,
+                    },
+                )
+                t["requests"] += 1
+                t["estimated_requests"] += 1 if usage.get("estimated") else 0
+                t["prompt_tokens"] += usage.get("prompt_tokens", 0)
+                t["completion_tokens"] += usage.get("completion_tokens", 0)
+                t["cached_prompt_tokens"] += usage.get("cached_prompt_tokens", 0)
+                if cost is None:
+                    t["unpriced_requests"] += 1
+                else:
+                    t["cost_usd"] += cost
+                t["latency_ms"] += latency_ms
+                if ttft_ms is not None:
+                    t["ttft_ms"] += ttft_ms
+                    t["ttft_samples"] += 1
+        return cost
+
+    def report(self) -> Dict[str, Any]:
+        """汇总结果；每个维度按 token 总量降序，耗时给出平均值。"""
+        out: Dict[str, Any] = {}
+        with self._lock:
+            for dim, groups in self._totals.items():
+                rows = []
+                for key, t in groups.items():
+                    n = t["requests"]
+                    rows.append(
+                        {
+                            dim: key,
+                            "requests": n,
+                            "estimated_requests": t["estimated_requests"],
+                            "prompt_tokens": t["prompt_tokens"],
+                            "completion_tokens": t["completion_tokens"],
+                            "cached_prompt_tokens": t["cached_prompt_tokens"],
+                            "total_tokens": t["prompt_tokens"] + t["completion_tokens"],
+                            "cost_usd": round(t["cost_usd"], 6),
+                            "unpriced_requests": t["unpriced_requests"],
+                            "avg_latency_ms": round(t["latency_ms"] / n, 1) if n else 0.0,
+                            "avg_ttft_ms": round(t["ttft_ms"] / t["ttft_samples"], 1) if t["ttft_samples"] else None,
+                        }
+                    )
+                rows.sort(key=lambda r: r["total_tokens"], reverse=True)
+                out[f"by_{dim}"] = rows
+        return out
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+
+
+def load_pricing(path: str) -> Dict[str, Dict[str, float]]:
+    """读取定价 JSON：{"model": {"input": 美元/百万, "output": ..., "cached_input": ...}}。"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise RuntimeError("pricing JSON must be an object keyed by model")
+    return data
+
+
+# -------------------- 请求体压缩 -------------------- #
+def encode_body(payload: Dict[str, Any], compress_min_bytes: int = 0) -> Tuple[bytes, Dict[str, str]]:
+    """
+    序列化请求体；compress_min_bytes > 0 且正文不小于该值时用 gzip 压缩，返回 (正文, 额外请求头)。
+    需要服务端能解码 Content-Encoding: gzip 的请求体（/webapi/chat 已支持），旧版服务端请保持为 0。
+    """
+    raw = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    if compress_min_bytes > 0 and len(raw) >= compress_min_bytes:
+        packed = gzip.compress(raw, compresslevel=6)
+        if len(packed) < len(raw):
+            return packed, {"Content-Encoding": "gzip"}
+    return raw, {}
+
+
+# -------------------- SSE 解析 -------------------- #
+class StreamError(RuntimeError):
+    """上游在 SSE 中以 event: error 报告的错误；code 为 LobeChat 的错误类型（如 InsufficientQuota）。"""
+
+    def __init__(self, message: str, code: Optional[str] = None) -> None:
+        super().__init__(message)
+        self.code = code
+
+
+def _stream_error(data: str) -> StreamError:
+    try:
+        obj = json.loads(data)
+    except Exception:
+        return StreamError(data or "upstream error")
+    if not isinstance(obj, dict):
+        return StreamError(str(obj))
+    message = obj.get("message") or json.dumps(obj.get("body") or obj, ensure_ascii=False)
+    code = obj.get("type") or obj.get("errorType")
+    return StreamError(str(message), str(code) if code else None)
+
+
+def _tool_call_deltas(data: str) -> List[Dict[str, Any]]:
+    """LobeChat 的 tool_calls 事件 -> OpenAI 形式的增量（arguments 为片段）。"""
+    try:
+        items = json.loads(data)
+    except Exception:
+        return []
+    calls: List[Dict[str, Any]] = []
+    for i, item in enumerate(items if isinstance(items, list) else []):
+        if not isinstance(item, dict):
+            continue
+        fn = item.get("function") if isinstance(item.get("function"), dict) else {}
+        call: Dict[str, Any] = {"index": item.get("index", i)}
+        if item.get("id"):
+            call["id"] = item["id"]
+            call["type"] = item.get("type") or "function"
+        call["function"] = {k: fn[k] for k in ("name", "arguments") if fn.get(k) is not None}
+        calls.append(call)
+    return calls
+
+
+def parse_sse_data(event: str, data: str, meta: Dict[str, Any]) -> str:
+    """
+    解析一条 SSE data 行（event 为其前最近的 event: 值），返回正文片段（可能为空）。
+    - event: error 抛出 StreamError，不能把空回复或半截回复当作成功
+    - 思考过程等 SKIPPED_EVENTS 不当作正文
+    - 元数据写入 meta：usage、finish_reason（stop 事件），tool_calls（本条事件的增量，由调用方取走）
+    """
+    if event == "error":
+        raise _stream_error(data)
+    if event in SKIPPED_EVENTS:
+        return ""
+    if event == "tool_calls":
+        meta["tool_calls"] = _tool_call_deltas(data)
+        return ""
+    if event in META_EVENTS:
+        try:
+            obj = json.loads(data)
+        except Exception:
+            obj = data
+        if event == "usage" and isinstance(obj, dict):
+            meta["usage"] = normalize_usage(obj)
+        elif event == "stop" and isinstance(obj, str) and obj:
+            meta["finish_reason"] = obj
+        return ""
+    # 尝试解析 JSON 块，否则按纯文本处理
+    chunk_text = ""
+    try:
+        if data.startswith("{") or data.startswith("["):
+            obj = json.loads(data)
+            if isinstance(obj, dict):
+                # OpenAI 兼容流的最后一块可能只携带 usage
+                if isinstance(obj.get("usage"), dict):
+                    meta["usage"] = normalize_usage(obj["usage"]) or meta.get("usage")
+                chunk_text = obj.get("content") or obj.get("delta") or obj.get("text") or ""
+                if not chunk_text:
+                    choices = obj.get("choices")
+                    if isinstance(choices, list) and choices:
+                        first = choices[0]
+                        if isinstance(first, dict):
+                            delta = first.get("delta")
+                            if isinstance(delta, dict):
+                                chunk_text = delta.get("content") or ""
+        else:
+            # 也可能是 JSON 字符串，比如 "你好"
+            try:
+                s = json.loads(data)
+                if isinstance(s, str):
+                    chunk_text = s
+            except Exception:
+                chunk_text = data
+    except Exception:
+        chunk_text = data
+    return chunk_text
+
+
 # -------------------- 聊天客户端 -------------------- #
+class _Turn:
+    """一次 send() 的取消状态。每轮独立，被放弃的旧请求在后台收尾时不会影响新一轮。"""
+
+    def __init__(self) -> None:
+        self.cancelled = threading.Event()
+        self.receiving = False  # 已收到第一个正文片段
+        self.resp: Optional[requests.Response] = None
+        self._lock = threading.Lock()
+
+    def start_receiving(self) -> bool:
+        """收到第一个正文片段时调用；已被取消（调用方已放弃）时返回 False。"""
+        with self._lock:
+            if self.cancelled.is_set():
+                return False
+            self.receiving = True
+            return True
+
+    def cancel(self) -> bool:
+        with self._lock:
+            self.cancelled.set()
+            receiving = self.receiving
+        resp = self.resp
+        if resp is not None:
+            resp.close()
+        return receiving
+
+
 class RoleChatClient:
-    def __init__(self, base_url: str, provider: str, model: str, user_id: str) -> None:
+    def __init__(
+        self,
+        base_url: str,
+        provider: str,
+        model: str,
+        user_id: str,
+        session: Optional[requests.Session] = None,
+        render_fps: float = 0.0,
+        render_max_bytes: int = 4096,
+        render_flush_newline: bool = False,
+        usage: Optional[UsageTracker] = None,
+        session_id: Optional[str] = None,
+        priority: str = "interactive",
+        scheduler: Optional[RequestScheduler] = None,
+        compress_min_bytes: int = 0,
+    ) -> None:
         self.base_url = base_url.rstrip("/")
         self.provider = provider
         self.model = model
@@ -159,17 +545,53 @@ class RoleChatClient:
             "Accept": "text/event-stream",
             # 可选：你可以根据需要添加链路追踪等额外请求头
         }
+        # 多个客户端可共享同一个 Session，以复用连接池（如批量评测）
+        self.session = session or requests.Session()
+        # 流式输出的终端渲染参数（见 StreamRenderer）
+        self.render_fps = render_fps
+        self.render_max_bytes = render_max_bytes
+        self.render_flush_newline = render_flush_newline
         self.roles_cache: Optional[List[Dict[str, Any]]] = None
         self.system_prompt: Optional[str] = None
         self.history: List[Dict[str, Any]] = []  # OpenAI-style messages without system
+        # 用量统计：tracker 可在多个客户端间共享；last_usage 为最近一次 send() 的用量
+        self.usage = usage or UsageTracker()
+        self.session_id = session_id or uuid.uuid4().hex[:12]
+        self.last_usage: Optional[Dict[str, Any]] = None
+        # cancel() 可从其他线程中断进行中的回复
+        self._turn = _Turn()
+        # 请求经进程内调度器排队：批量评测等用 bulk，避免挤占在线对话（见 request_scheduler）
+        self.priority = priority
+        self.scheduler = scheduler or default_scheduler()
+        # 每轮都会上传完整历史：超过该字节数的请求体 gzip 压缩后再发送（0 表示不压缩）
+        self.compress_min_bytes = compress_min_bytes
+
+    def reset_cancel(self) -> None:
+        """开始新的一轮；取消标记不会在 send() 内自动清除，以免丢掉刚好在发送前到达的取消。"""
+        self._turn = _Turn()
+
+    def cancel(self) -> bool:
+        """
+        中断进行中（或即将开始）的 send()：关闭底层连接，已收到的部分回复会保留并写入历史。
+        返回是否已在接收正文：为 False 时（调度排队、等待首字节、非流式）send() 可能还要等上游返回才结束，
+        调用方可以不再等待它；它结束时会丢弃结果，不输出、不写历史。
+        """
+        return self._turn.cancel()
 
-    def list_models(self, provider: Optional[str] = None) -> List[Dict[str, Any]]:
+    def load_roles(self) -> List[Dict[str, Any]]:
+        if self.roles_cache is None:
+            with self.scheduler.slot(self.priority):
+                self.roles_cache = fetch_roles(self.base_url, self.session)
+        return self.roles_cache
+
+    def list_models(self, provider: Optional[str] = None, priority: Optional[str] = None) -> List[Dict[str, Any]]:
         prov = (provider or self.provider).strip()
         url = f"{self.base_url}/webapi/models/{prov}"
         # 使用 JSON Accept 以获取列表
         headers = dict(self.headers)
         headers["Accept"] = "application/json"
-        r = requests.get(url, headers=headers, timeout=60)
+        with self.scheduler.slot(priority or self.priority):
+            r = self.session.get(url, headers=headers, timeout=60)
         r.raise_for_status()
         data = r.json()
         if isinstance(data, list):
@@ -177,19 +599,73 @@ class RoleChatClient:
         return []
 
     def _ensure_role(self, role_name: str) -> None:
-        if self.roles_cache is None:
-            self.roles_cache = fetch_roles(self.base_url)
-        role = find_role_by_name(self.roles_cache, role_name)
+        role = find_role_by_name(self.load_roles(), role_name)
         if not role:
             raise RuntimeError(f"Role not found: {role_name}")
+        if "description" not in role and role.get("role_id") is not None:
+            # 列表只含 role_id/name：按需拉取该角色的完整内容，并缓存在列表项上供后续复用
+            with self.scheduler.slot(self.priority):
+                role.update(fetch_role(self.base_url, role["role_id"], self.session))
         self.system_prompt = build_system_prompt(role)
 
     def _chat_endpoint(self) -> str:
         return f"{self.base_url}/webapi/chat/{self.provider}"
 
-    def send(self, role_name: str, user_text: str, stream: bool = True) -> str:
-        """发送一条消息并返回助手的完整回复（stream=True 时会打印流式片段）。"""
+    def _consume_stream(
+        self,
+        turn: _Turn,
+        resp: requests.Response,
+        renderer: Optional[StreamRenderer],
+        full_reply: List[str],
+        meta: Dict[str, Any],
+    ) -> None:
+        """
+        逐行解析 SSE，把文本片段交给 renderer 并收集到 full_reply。
+        usage / speed 等元数据事件不当作正文，写入 meta（usage、first_chunk_at）。
+        """
+        event = ""
+        for raw_line in resp.iter_lines(decode_unicode=False):
+            if turn.cancelled.is_set():
+                break
+            if not raw_line:
+                continue
+            try:
+                line = raw_line.decode("utf-8", errors="replace").strip()
+            except Exception:
+                line = raw_line.decode(errors="replace").strip()
+            if not line or line.startswith(":"):
+                continue
+            if line.lower().startswith("event:"):
+                event = line[6:].strip()
+                continue
+            # 只处理 data: 行；跳过 id
+            if not line.lower().startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            chunk_text = parse_sse_data(event, data, meta)
+            if not chunk_text:
+                continue
+            if "first_chunk_at" not in meta:
+                if not turn.start_receiving():
+                    # 调用方已放弃这一轮：丢弃全部内容
+                    break
+                meta["first_chunk_at"] = time.perf_counter()
+            if renderer is not None:
+                renderer.write(chunk_text)
+            full_reply.append(chunk_text)
+
+    def send(self, role_name: str, user_text: str, stream: bool = True, echo: bool = True) -> str:
+        """
+        发送一条消息并返回助手的完整回复（stream=True 且 echo=True 时会打印流式片段）。
+        在收到第一个正文片段之前被 cancel()（含发送前、调度排队中、等待首字节、非流式等待中）时返回空字符串，
+        不输出、不写入历史；之后被 cancel() 则保留已收到的部分回复。
+        """
+        turn = self._turn
         self._ensure_role(role_name)
+        if turn.cancelled.is_set():
+            return ""
 
         messages: List[Dict[str, Any]] = []
         if self.system_prompt:
@@ -203,139 +679,331 @@ class RoleChatClient:
             "stream": stream,
         }
 
+        body, extra_headers = encode_body(payload, self.compress_min_bytes)
         full_reply = []
-        with requests.post(self._chat_endpoint(), data=json.dumps(payload), headers=self.headers, timeout=600, stream=stream) as resp:
-            if resp.status_code >= 400:
-                # Try to show detailed provider error
-                err_text = None
-                try:
-                    err_text = resp.text
-                    err_json = json.loads(err_text)
-                    # Common shape: { errorType, body: { error, provider, ... } }
-                    raise RuntimeError(f"HTTP {resp.status_code} | {err_json}")
-                except json.JSONDecodeError:
-                    raise RuntimeError(f"HTTP {resp.status_code} | {err_text}")
-
-            if stream:
-                for raw_line in resp.iter_lines(decode_unicode=False):
-                    if not raw_line:
-                        continue
+        meta: Dict[str, Any] = {}
+        started = time.perf_counter()
+        # 名额占用到流式回复读完为止：并发上限限制的是同时进行的生成数
+        with self.scheduler.slot(self.priority):
+            if turn.cancelled.is_set():
+                # 排队期间被取消：不再发出请求
+                return ""
+            with self.session.post(
+                self._chat_endpoint(), data=body, headers={**self.headers, **extra_headers}, timeout=600, stream=stream
+            ) as resp:
+                turn.resp = resp
+                if turn.cancelled.is_set():
+                    # 等待响应头期间被取消（非流式时正文也已读完）：调用方已不再等待，丢弃结果
+                    return ""
+                if resp.status_code >= 400:
+                    # Try to show detailed provider error
+                    err_text = None
+                    try:
+                        err_text = resp.text
+                        err_json = json.loads(err_text)
+                        # Common shape: { errorType, body: { error, provider, ... } }
+                        raise RuntimeError(f"HTTP {resp.status_code} | {err_json}")
+                    except json.JSONDecodeError:
+                        raise RuntimeError(f"HTTP {resp.status_code} | {err_text}")
+
+                if stream:
+                    renderer = (
+                        StreamRenderer(
+                            sys.stdout,
+                            fps=self.render_fps,
+                            max_bytes=self.render_max_bytes,
+                            flush_on_newline=self.render_flush_newline,
+                        )
+                        if echo
+                        else None
+                    )
                     try:
-                        line = raw_line.decode("utf-8", errors="replace").strip()
+                        self._consume_stream(turn, resp, renderer, full_reply, meta)
                     except Exception:
-                        line = raw_line.decode(errors="replace").strip()
-                    if not line or line.startswith(":"):
-                        continue
-                    # 只处理 data: 行；跳过 id/event
-                    if not line.lower().startswith("data:"):
-                        continue
-                    data = line[5:].strip()
-                    if data == "[DONE]":
-                        break
-                    # 尝试解析 JSON 块，否则按纯文本处理
-                    chunk_text = ""
+                        # cancel() 从其他线程关闭连接时，读取会以各种异常结束；此时保留部分回复
+                        if not turn.cancelled.is_set():
+                            raise
+                    finally:
+                        if renderer is not None:
+                            renderer.close()
+                    if not turn.receiving:
+                        # 尚未输出任何内容就被取消：调用方已放弃这一轮
+                        return ""
+                    if echo:
+                        print(" [stopped]" if turn.cancelled.is_set() else "")  # 流结束后换行
+                elif "text/event-stream" in resp.headers.get("Content-Type", ""):
+                    # 聊天接口即使 stream=false 也可能以 SSE 返回：同样逐行解析，event: error 照常抛出
+                    self._consume_stream(turn, resp, None, full_reply, meta)
+                    if turn.cancelled.is_set() and not turn.receiving:
+                        return ""
+                    if echo:
+                        print("".join(full_reply))
+                else:
+                    # non-stream: read once; provider formats may vary
+                    text = resp.text or ""
                     try:
-                        if data.startswith("{") or data.startswith("["):
-                            obj = json.loads(data)
-                            if isinstance(obj, dict):
-                                chunk_text = obj.get("content") or obj.get("delta") or obj.get("text") or ""
-                                if not chunk_text:
-                                    choices = obj.get("choices")
-                                    if isinstance(choices, list) and choices:
-                                        first = choices[0]
-                                        if isinstance(first, dict):
-                                            delta = first.get("delta")
-                                            if isinstance(delta, dict):
-                                                chunk_text = delta.get("content") or ""
-                        else:
-                            # 也可能是 JSON 字符串，比如 "你好"
-                            try:
-                                s = json.loads(data)
-                                if isinstance(s, str):
-                                    chunk_text = s
-                            except Exception:
-                                chunk_text = data
+                        obj = json.loads(text)
+                        if isinstance(obj.get("usage"), dict):
+                            meta["usage"] = normalize_usage(obj["usage"])
+                        text = obj.get("content") or obj.get("delta") or text
                     except Exception:
-                        chunk_text = data
-                    if not chunk_text:
-                        continue
-                    sys.stdout.write(chunk_text)
-                    sys.stdout.flush()
-                    full_reply.append(chunk_text)
-                print()  # 流结束后换行
-            else:
-                # non-stream: read once; provider formats may vary
-                text = resp.text or ""
-                try:
-                    obj = json.loads(text)
-                    text = obj.get("content") or obj.get("delta") or text
-                except Exception:
-                    pass
-                print(text)
-                full_reply.append(text)
+                        pass
+                    if echo:
+                        print(text)
+                    full_reply.append(text)
+
+        assistant_text = "".join(full_reply)
+        # 服务商未返回 usage 时按本地估算
+        usage = meta.get("usage") or estimate_usage(messages, assistant_text)
+        first = meta.get("first_chunk_at")
+        usage["cost_usd"] = self.usage.record(
+            {"session": self.session_id, "role": role_name, "model": self.model, "provider": self.provider},
+            usage,
+            latency_ms=(time.perf_counter() - started) * 1000,
+            ttft_ms=(first - started) * 1000 if first is not None else None,
+        )
+        self.last_usage = usage
 
         # 更新历史
         self.history.append({"role": "user", "content": user_text})
-        assistant_text = "".join(full_reply)
         self.history.append({"role": "assistant", "content": assistant_text})
         return assistant_text
 
 
-# -------------------- 命令行 CLI -------------------- #
-def main() -> None:
-    parser = argparse.ArgumentParser(description="Chat with a LobeChat role from Python")
-    parser.add_argument("--base", default=DEFAULT_BASE_URL, help="LobeChat base URL, e.g., http://localhost:3010")
-    parser.add_argument("--role", required=False, help="Role name (must exist in roles.json)")
-    parser.add_argument("--msg", help="Send one-shot message and exit (otherwise interactive)")
-    parser.add_argument("--user", default="PY_USER", help="User ID for auth payload")
-    parser.add_argument("--provider", default=DEFAULT_PROVIDER, help="Provider, default: openai")
-    parser.add_argument("--model", default=DEFAULT_MODEL, help="Model, default: gpt-5-mini")
-    parser.add_argument("--no-stream", action="store_true", help="Disable streaming")
-    parser.add_argument("--list-models", action="store_true", help="List available models for current provider and exit")
+# -------------------- 模型目录（磁盘缓存） -------------------- #
+def model_names(models: List[Dict[str, Any]]) -> List[str]:
+    names: List[str] = []
+    for m in models:
+        if isinstance(m, dict):
+            name = m.get("id") or m.get("name") or m.get("model")
+            if name:
+                names.append(str(name))
+    return names
 
-    args = parser.parse_args()
 
-    # 自动从 .env.local / .env 加载 OPENAI_*（若未在环境中设置）
-    load_env_from_dotenv()
+def _default_cache_path() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "lobechat", "py_role_chat_models.json")
 
-    client = RoleChatClient(base_url=args.base, provider=args.provider, model=args.model, user_id=args.user)
 
-    if args.list_models:
+class ModelCatalog:
+    """
+    按服务商缓存 /webapi/models/{provider} 的结果（以 base_url 区分不同后端）：
+    - 新鲜期（ttl）内直接返回磁盘缓存，不发请求
+    - 过期但未超过 max_stale 时立即返回旧数据，同时在后台线程刷新（stale-while-revalidate）
+    - 无缓存或过旧时同步拉取；多个服务商并发查询
+    """
+
+    def __init__(
+        self,
+        client: "RoleChatClient",
+        cache_path: Optional[str] = None,
+        ttl: float = MODEL_CACHE_TTL,
+        max_stale: float = MODEL_CACHE_MAX_STALE,
+    ) -> None:
+        self.client = client
+        self.cache_path = cache_path or _default_cache_path()
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._lock = threading.Lock()
+        self._refreshing: set = set()
+        self._entries: Dict[str, Dict[str, Any]] = self._load()
+
+    def _key(self, provider: str) -> str:
+        return f"{self.client.base_url}|{provider}"
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
         try:
-            models = client.list_models()
-            # Try to print id/name fields
-            names: List[str] = []
-            for m in models:
-                if isinstance(m, dict):
-                    name = m.get("id") or m.get("name") or m.get("model")
-                    if name:
-                        names.append(str(name))
-            if names:
-                print("\n".join(names))
-            else:
-                # fallback: print raw
-                print(json.dumps(models, ensure_ascii=False, indent=2))
-        except Exception as e:
-            print(f"[error] list models failed: {e}")
-        return
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self) -> None:
+        # 调用方需持有 self._lock；先写临时文件再替换，避免并发进程读到半个文件
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp = f"{self.cache_path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(tmp, self.cache_path)
+        except OSError:
+            pass
+
+    def _fetch(self, provider: str, priority: Optional[str] = None) -> List[Dict[str, Any]]:
+        models = self.client.list_models(provider, priority)
+        with self._lock:
+            self._entries[self._key(provider)] = {"fetched_at": time.time(), "models": models}
+            self._save()
+        return models
+
+    def _revalidate(self, provider: str) -> None:
+        with self._lock:
+            if provider in self._refreshing:
+                return
+            self._refreshing.add(provider)
+
+        def run() -> None:
+            try:
+                self._fetch(provider, "background")
+            except Exception:
+                pass
+            finally:
+                with self._lock:
+                    self._refreshing.discard(provider)
+
+        threading.Thread(target=run, name=f"models-refresh-{provider}", daemon=True).start()
+
+    def get(self, provider: str, refresh: bool = False) -> List[Dict[str, Any]]:
+        if not refresh:
+            with self._lock:
+                entry = self._entries.get(self._key(provider))
+            if entry:
+                age = time.time() - float(entry.get("fetched_at", 0))
+                if age < self.ttl:
+                    return entry.get("models") or []
+                if age < self.max_stale:
+                    self._revalidate(provider)
+                    return entry.get("models") or []
+        return self._fetch(provider)
+
+    def get_many(self, providers: List[str], refresh: bool = False) -> Dict[str, Any]:
+        """并发查询多个服务商；值为模型列表，失败时为对应异常。"""
+        results: Dict[str, Any] = {}
+        if not providers:
+            return results
+        with ThreadPoolExecutor(max_workers=min(8, len(providers))) as pool:
+            futures = {p: pool.submit(self.get, p, refresh) for p in providers}
+            for p, fut in futures.items():
+                try:
+                    results[p] = fut.result()
+                except Exception as e:
+                    results[p] = e
+        return results
+
+    def cached_names(self, provider: str) -> List[str]:
+        """仅查本地缓存（不发请求），用于补全与校验。"""
+        with self._lock:
+            entry = self._entries.get(self._key(provider))
+        return model_names(entry.get("models") or []) if entry else []
+
+    def providers(self) -> List[str]:
+        """用户配置过的服务商：当前服务商、环境变量 LOBE_PROVIDERS 中列出的，以及缓存中出现过的。"""
+        prefix = f"{self.client.base_url}|"
+        with self._lock:
+            cached = [k[len(prefix) :] for k in self._entries if k.startswith(prefix)]
+        configured = [p.strip() for p in os.environ.get(PROVIDERS_ENV, "").split(",") if p.strip()]
+        return list(dict.fromkeys([self.client.provider, *configured, *cached]))
+
+
+# -------------------- 交互式 REPL -------------------- #
+def print_models(models: List[Dict[str, Any]]) -> None:
+    # Try to print id/name fields
+    names = model_names(models)
+    if names:
+        print("\n".join(names))
+    else:
+        # fallback: print raw
+        print(json.dumps(models, ensure_ascii=False, indent=2))
+
+
+def _start_stdin_reader(loop: asyncio.AbstractEventLoop, queue: "asyncio.Queue[Optional[str]]") -> None:
+    """
+    后台线程持续读取标准输入并投递到 queue（EOF 时投递 None）。
+    生成回复期间也在读取，因此可以随时输入 /stop；守护线程不会阻塞进程退出。
+    """
+
+    def run() -> None:
+        while True:
+            try:
+                line = input()
+            except (EOFError, KeyboardInterrupt):
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+                return
+            loop.call_soon_threadsafe(queue.put_nowait, line)
+
+    threading.Thread(target=run, name="stdin-reader", daemon=True).start()
 
-    if not args.role:
-        print("[error] --role is required unless --list-models is used")
-        return
 
-    if args.msg:
-        client.send(args.role, args.msg, stream=not args.no_stream)
+def _background(fn: Any, *args: Any) -> asyncio.Future:
+    """在线程中执行阻塞调用；未被 await 的失败不会在退出时产生告警。"""
+    fut = asyncio.ensure_future(asyncio.to_thread(fn, *args))
+    fut.add_done_callback(lambda f: f.cancelled() or f.exception())
+    return fut
+
+
+def _warn_unknown_model(catalog: ModelCatalog, provider: str, model: str) -> None:
+    names = catalog.cached_names(provider)
+    if names and model not in names:
+        print(f"[warn] model '{model}' is not in the cached catalog of '{provider}' (see /models)")
+
+
+def _install_model_completer(client: RoleChatClient, catalog: ModelCatalog) -> None:
+    """为 /model 提供基于本地缓存的 Tab 补全（readline 不可用时静默跳过）。"""
+    try:
+        import readline
+    except ImportError:
         return
 
-    # Interactive loop
-    print(f"[py-role-chat] Role: {args.role} | Provider: {args.provider} | Model: {args.model}")
-    print("Commands: /model <name>, /provider <name>, /models, /help, /exit")
+    def complete(text: str, state: int) -> Optional[str]:
+        buf = readline.get_line_buffer()
+        if not buf.startswith("/model "):
+            return None
+        matches = [n for n in catalog.cached_names(client.provider) if n.startswith(text)]
+        return matches[state] if state < len(matches) else None
+
+    readline.set_completer_delims(" ")
+    readline.set_completer(complete)
+    readline.parse_and_bind("tab: complete")
+
+
+async def interactive(client: RoleChatClient, args: argparse.Namespace, catalog: ModelCatalog) -> None:
+    """
+    asyncio 交互循环：
+    - 启动时在后台预取角色列表并预热模型目录缓存，首条消息与 /models 无需再等待完整往返
+    - 回复生成期间 Ctrl-C 或输入 /stop 只中断当前回复（保留已收到的部分），不退出 REPL；
+      尚未收到任何内容时（排队、等待首字节、--no-stream）直接放弃这次请求并回到提示符，工作线程在后台收尾
+    - 生成期间输入的其他内容会排队，待当前回复结束后依次处理
+    """
+    loop = asyncio.get_running_loop()
+    queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+    backlog: List[Optional[str]] = []
+    generating: Optional[asyncio.Future] = None
+    stop_requested = asyncio.Event()
+
+    roles_task: Optional[asyncio.Future] = _background(client.load_roles)
+    _background(catalog.get, client.provider)
+    _install_model_completer(client, catalog)
+
+    def on_sigint() -> None:
+        if generating is not None and not generating.done():
+            stop_requested.set()
+        else:
+            queue.put_nowait(None)
+
+    try:
+        loop.add_signal_handler(signal.SIGINT, on_sigint)
+    except (NotImplementedError, RuntimeError):
+        # Windows 事件循环不支持 add_signal_handler
+        signal.signal(signal.SIGINT, lambda *_: loop.call_soon_threadsafe(on_sigint))
+
+    _start_stdin_reader(loop, queue)
+
+    print(f"[py-role-chat] Role: {args.role} | Provider: {client.provider} | Model: {client.model}")
+    print("Commands: /model <name>, /provider <name>, /models [refresh], /usage [dim], /sched, /stop, /help, /exit")
+    _warn_unknown_model(catalog, client.provider, client.model)
     while True:
-        try:
-            user_text = input("> ").strip()
-        except (EOFError, KeyboardInterrupt):
+        if backlog:
+            line = backlog.pop(0)
+        else:
+            sys.stdout.write("> ")
+            sys.stdout.flush()
+            line = await queue.get()
+        if line is None:
             print()
             break
+        user_text = line.strip()
         if not user_text:
             continue
         if user_text.startswith("/"):
@@ -345,12 +1013,27 @@ def main() -> None:
             if cmd in {"exit", "quit"}:
                 break
             if cmd == "help":
-                print("Available commands: /model <name>, /provider <name>, /models, /exit")
+                print("Available commands: /model <name>, /provider <name>, /models [refresh], /usage [session|role|model|provider], /sched, /stop, /exit")
+                continue
+            if cmd == "stop":
+                print("[info] nothing to stop")
+                continue
+            if cmd == "usage":
+                report = client.usage.report()
+                if arg:
+                    # /usage role|model|provider|session 只看某一维度
+                    report = {k: v for k, v in report.items() if k == f"by_{arg}"} or report
+                print(json.dumps(report, ensure_ascii=False, indent=2))
+                continue
+            if cmd == "sched":
+                # 各优先级的排队 / 在途数与排队等待分布
+                print(json.dumps(client.scheduler.stats(), ensure_ascii=False, indent=2))
                 continue
             if cmd == "model":
                 if arg:
                     client.model = arg
                     print(f"[set] model -> {client.model}")
+                    _warn_unknown_model(catalog, client.provider, client.model)
                 else:
                     print(f"[current] model = {client.model} | usage: /model <name>")
                 continue
@@ -358,31 +1041,130 @@ def main() -> None:
                 if arg:
                     client.provider = arg
                     print(f"[set] provider -> {client.provider}")
+                    _background(catalog.get, client.provider)
                 else:
                     print(f"[current] provider = {client.provider} | usage: /provider <name>")
                 continue
             if cmd == "models":
                 try:
-                    models = client.list_models()
-                    names = []
-                    for m in models:
-                        if isinstance(m, dict):
-                            nm = m.get("id") or m.get("name") or m.get("model")
-                            if nm:
-                                names.append(str(nm))
-                    if names:
-                        print("\n".join(names))
-                    else:
-                        print(json.dumps(models, ensure_ascii=False, indent=2))
+                    print_models(await asyncio.to_thread(catalog.get, client.provider, arg == "refresh"))
                 except Exception as e:
                     print(f"[error] list models failed: {e}")
                 continue
             print(f"[warn] unknown command: /{cmd}")
             continue
-        try:
-            client.send(args.role, user_text, stream=not args.no_stream)
-        except Exception as e:
-            print(f"[error] {e}")
+
+        if roles_task is not None:
+            # 预取仍在进行时直接等待其结果；若预取失败，send() 会自行重新拉取
+            await asyncio.wait({roles_task})
+            roles_task = None
+        client.reset_cancel()
+        stop_requested.clear()
+        generating = asyncio.ensure_future(asyncio.to_thread(client.send, args.role, user_text, not args.no_stream))
+        abandoned = False
+        while not generating.done():
+            getter = asyncio.ensure_future(queue.get())
+            stopper = asyncio.ensure_future(stop_requested.wait())
+            await asyncio.wait({generating, getter, stopper}, return_when=asyncio.FIRST_COMPLETED)
+            for waiter in (getter, stopper):
+                if not waiter.done():
+                    waiter.cancel()
+            if getter.done() and not getter.cancelled():
+                pending = getter.result()
+                if pending is not None and pending.strip() == "/stop":
+                    stop_requested.set()
+                else:
+                    # 包括 EOF（None）：等当前回复结束后再处理
+                    backlog.append(pending)
+            if stop_requested.is_set() and not generating.done():
+                stop_requested.clear()
+                if not client.cancel():
+                    # 还没有输出任何内容：不再等待工作线程（它收尾后返回空串、不写历史）
+                    generating.add_done_callback(lambda f: f.cancelled() or f.exception())
+                    print(" [stopped]")
+                    abandoned = True
+                    break
+        if not abandoned:
+            try:
+                generating.result()
+            except Exception as e:
+                print(f"[error] {e}")
+        generating = None
+
+
+# -------------------- 命令行 CLI -------------------- #
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Chat with a LobeChat role from Python")
+    parser.add_argument("--base", default=DEFAULT_BASE_URL, help="LobeChat base URL, e.g., http://localhost:3010")
+    parser.add_argument("--role", required=False, help="Role name (must exist in roles.json)")
+    parser.add_argument("--msg", help="Send one-shot message and exit (otherwise interactive)")
+    parser.add_argument("--user", default="PY_USER", help="User ID for auth payload")
+    parser.add_argument("--provider", default=DEFAULT_PROVIDER, help="Provider, default: openai (with --list-models: comma-separated list, or 'all' = the default provider, $LOBE_PROVIDERS and cached providers)")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Model, default: gpt-5-mini")
+    parser.add_argument("--no-stream", action="store_true", help="Disable streaming")
+    parser.add_argument("--list-models", action="store_true", help="List available models for current provider and exit")
+    parser.add_argument("--refresh-models", action="store_true", help="Bypass the on-disk model catalog cache")
+    parser.add_argument("--usage-report", help="Write accumulated token usage and cost to this JSON file on exit")
+    parser.add_argument("--pricing", help="JSON file of per-model prices (USD per 1M tokens) to extend the built-in table")
+    parser.add_argument("--compress-min-bytes", type=int, default=0, help="Gzip chat request bodies at least this large (0 = off; needs a server that decodes them)")
+    parser.add_argument("--render-fps", type=float, default=0.0, help="Batch streamed output at this frame rate (0 = write every chunk)")
+    parser.add_argument("--render-bytes", type=int, default=4096, help="Flush buffered output early once it exceeds this many bytes")
+    parser.add_argument("--render-flush-newline", action="store_true", help="Flush buffered output immediately on newline")
+
+    args = parser.parse_args()
+
+    # 自动从 .env.local / .env 加载 OPENAI_*（若未在环境中设置）
+    load_env_from_dotenv()
+
+    providers = [p.strip() for p in args.provider.split(",") if p.strip()] or [DEFAULT_PROVIDER]
+    if not args.list_models and (len(providers) > 1 or providers == ["all"]):
+        print("[error] a provider list or 'all' is only allowed with --list-models")
+        return
+    try:
+        tracker = UsageTracker(load_pricing(args.pricing) if args.pricing else None)
+    except Exception as e:
+        print(f"[error] load pricing failed: {e}")
+        return
+    client = RoleChatClient(
+        base_url=args.base,
+        provider=DEFAULT_PROVIDER if providers == ["all"] else providers[0],
+        model=args.model,
+        user_id=args.user,
+        render_fps=args.render_fps,
+        render_max_bytes=args.render_bytes,
+        render_flush_newline=args.render_flush_newline,
+        compress_min_bytes=args.compress_min_bytes,
+        usage=tracker,
+    )
+
+    catalog = ModelCatalog(client)
+
+    if args.list_models:
+        if providers == ["all"]:
+            providers = catalog.providers()
+        results = catalog.get_many(providers, refresh=args.refresh_models)
+        for prov, models in results.items():
+            if len(results) > 1:
+                print(f"# {prov}")
+            if isinstance(models, Exception):
+                print(f"[error] list models failed: {models}")
+            else:
+                print_models(models)
+        return
+
+    if not args.role:
+        print("[error] --role is required unless --list-models is used")
+        return
+
+    try:
+        if args.msg:
+            _warn_unknown_model(catalog, client.provider, client.model)
+            client.send(args.role, args.msg, stream=not args.no_stream)
+        else:
+            asyncio.run(interactive(client, args, catalog))
+    finally:
+        if args.usage_report:
+            tracker.save(args.usage_report)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地 OpenAI 兼容网关：把 LobeChat 的“角色”以 role:<角色名> 模型的形式暴露给只会说 OpenAI 协议的工具。
+- GET  /v1/models            列出 role:<角色名>（角色列表带 TTL 缓存，按 hash 判断角色内容是否变化）
+- POST /v1/chat/completions  按角色拼接系统提示词后转发到 /webapi/chat/{provider}，
+  并把 LobeChat 的 SSE 逐块翻译为 OpenAI chat.completion.chunk（stream=false 时聚合为 chat.completion）
+  正文 -> delta.content，工具调用 -> delta.tool_calls（finish_reason 为 tool_calls），思考过程等其他事件不转发；
+  上游报错时：尚未输出任何内容则返回带状态码的 OpenAI 错误，否则发送 error 块并结束流
+- 模型名写作 role:<角色名>@<上游模型> 可覆盖默认上游模型；非 role: 开头的模型原样转发，不加系统提示词
+- 上游连接复用同一个连接池；鉴权头按 user（请求体 user 字段或 X-User-Id 请求头）缓存
+- 所有上游请求经进程内调度器排队（见 request_scheduler）：聊天请求的优先级取 X-Priority 请求头或请求体 priority 字段
+  （interactive / background / bulk，默认 interactive，其他值返回 400），角色列表与系统提示词的拉取始终为 interactive；
+  批量脚本、评测等流量应声明 bulk 或 background，不会挤占交互请求
+- --compress-min-bytes：超过该字节数的上游请求体以 gzip 压缩发送（需服务端支持解码）
+- 依赖 aiohttp：pip install aiohttp
+
+使用示例：
+  python scripts/py_role_gateway.py --port 8787
+  curl http://127.0.0.1:8787/v1/chat/completions -H "Content-Type: application/json" \
+    -d '{"model": "role:张三", "messages": [{"role": "user", "content": "你好"}], "stream": true}'
+  # 批量任务以 bulk 优先级排队
+  curl http://127.0.0.1:8787/v1/chat/completions -H "Content-Type: application/json" -H "X-Priority: bulk" \
+    -d '{"model": "role:张三", "messages": [{"role": "user", "content": "总结一下"}]}'
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import aiohttp
+from aiohttp import web
+
+from py_role_chat import (
+    DEFAULT_BASE_URL,
+    DEFAULT_MODEL,
+    DEFAULT_PROVIDER,
+    StreamError,
+    build_auth_header,
+    build_system_prompt,
+    encode_body,
+    find_role_by_name,
+    load_env_from_dotenv,
+    normalize_usage,
+    parse_sse_data,
+)
+from request_scheduler import PRIORITY_CLASSES, RequestScheduler, default_scheduler
+
+ROLE_PREFIX = "role:"
+ROLES_TTL = 30.0  # 秒；角色列表缓存时长
+AUTH_CACHE_SIZE = 1024
+# 原样转发给上游的 OpenAI 请求字段（model / messages / stream 由网关自行填写）
+PASSTHROUGH_FIELDS = (
+    "temperature",
+    "top_p",
+    "max_tokens",
+    "frequency_penalty",
+    "presence_penalty",
+    "tools",
+    "tool_choice",
+    "response_format",
+)
+
+
+# 各家上游的结束原因 -> OpenAI finish_reason
+FINISH_REASONS = {"end_turn": "stop", "stop_sequence": "stop", "max_tokens": "length", "tool_use": "tool_calls"}
+
+
+def openai_error(status: int, message: str, code: Optional[str] = None, err_type: str = "invalid_request_error") -> web.Response:
+    return web.json_response({"error": {"message": message, "type": err_type, "code": code}}, status=status)
+
+
+def parse_model(model: str, default_model: str) -> Tuple[Optional[str], str]:
+    """role:<name>[@<upstream>] -> (name, upstream)；非角色模型返回 (None, model)。"""
+    if not model.startswith(ROLE_PREFIX):
+        return None, model
+    rest = model[len(ROLE_PREFIX):]
+    if "@" not in rest:
+        return rest, default_model
+    name, _, upstream = rest.rpartition("@")
+    return name, upstream or default_model
+
+
+def merge_tool_calls(merged: Dict[int, Dict[str, Any]], deltas: List[Dict[str, Any]]) -> None:
+    """把增量 tool_calls 按 index 合并为完整调用（stream=false 时使用）。"""
+    for delta in deltas:
+        call = merged.setdefault(delta["index"], {"id": None, "type": "function", "function": {"name": "", "arguments": ""}})
+        if delta.get("id"):
+            call["id"] = delta["id"]
+            call["type"] = delta.get("type") or "function"
+        fn = delta.get("function") or {}
+        if fn.get("name"):
+            call["function"]["name"] = fn["name"]
+        call["function"]["arguments"] += fn.get("arguments") or ""
+
+
+def finish_reason(meta: Dict[str, Any], has_tool_calls: bool) -> str:
+    if has_tool_calls:
+        return "tool_calls"
+    reason = meta.get("finish_reason")
+    reason = FINISH_REASONS.get(reason, reason)
+    return reason if reason in ("stop", "length", "content_filter") else "stop"
+
+
+async def iter_sse_events(upstream: aiohttp.ClientResponse, meta: Dict[str, Any]) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    逐行读取上游 SSE（事件分类见 parse_sse_data），产出 ("text", 正文片段) 或 ("tool_calls", OpenAI 增量列表)；
+    usage 与结束原因写入 meta，event: error 抛出 StreamError。
+    """
+    event = ""
+    async for raw_line in upstream.content:
+        line = raw_line.strip()
+        if not line or line.startswith(b":"):
+            continue
+        if line[:6].lower() == b"event:":
+            event = line[6:].strip().decode("utf-8", errors="replace")
+            continue
+        # 只处理 data: 行；跳过 id
+        if line[:5].lower() != b"data:":
+            continue
+        data = line[5:].strip().decode("utf-8", errors="replace")
+        if data == "[DONE]":
+            break
+        text = parse_sse_data(event, data, meta)
+        calls = meta.pop("tool_calls", None)
+        if calls:
+            yield "tool_calls", calls
+        if text:
+            yield "text", text
+
+
+# -------------------- 网关状态 -------------------- #
+class Gateway:
+    def __init__(
+        self,
+        base_url: str,
+        provider: str,
+        model: str,
+        default_user: str,
+        pool_size: int = 64,
+        roles_ttl: float = ROLES_TTL,
+        compress_min_bytes: int = 0,
+        scheduler: Optional[RequestScheduler] = None,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.provider = provider
+        self.model = model
+        self.default_user = default_user
+        self.pool_size = pool_size
+        self.roles_ttl = roles_ttl
+        self.compress_min_bytes = compress_min_bytes
+        self.scheduler = scheduler or default_scheduler()
+        self.session: Optional[aiohttp.ClientSession] = None
+
+        self._roles: List[Dict[str, Any]] = []
+        self._roles_at = 0.0
+        self._roles_lock = asyncio.Lock()
+        # role_id -> (hash, 系统提示词)；hash 变化时失效
+        self._prompts: Dict[str, Tuple[Optional[str], str]] = {}
+        self._auth: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+
+    async def start(self, _app: web.Application) -> None:
+        connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60)
+        # 流式回复可能持续很久，只限制建连与两次读之间的间隔
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=600)
+        self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    async def close(self, _app: web.Application) -> None:
+        if self.session is not None:
+            await self.session.close()
+
+    def auth_headers(self, user_id: str) -> Dict[str, str]:
+        headers = self._auth.get(user_id)
+        if headers is None:
+            headers = {**build_auth_header(user_id), "Content-Type": "application/json"}
+            self._auth[user_id] = headers
+            if len(self._auth) > AUTH_CACHE_SIZE:
+                self._auth.popitem(last=False)
+        else:
+            self._auth.move_to_end(user_id)
+        return headers
+
+    async def roles(self, refresh: bool = False) -> List[Dict[str, Any]]:
+        if not refresh and time.monotonic() - self._roles_at < self.roles_ttl:
+            return self._roles
+        async with self._roles_lock:
+            # 并发请求只触发一次拉取
+            if not refresh and time.monotonic() - self._roles_at < self.roles_ttl:
+                return self._roles
+            assert self.session is not None
+            url = f"{self.base_url}/webapi/roles"
+            async with self.scheduler.aslot("interactive"), self.session.get(url, params={"fields": "role_id,name,hash"}) as r:
+                r.raise_for_status()
+                data = await r.json(content_type=None)
+            self._roles = data if isinstance(data, list) else []
+            self._roles_at = time.monotonic()
+            return self._roles
+
+    async def system_prompt(self, name: str) -> Optional[str]:
+        """返回角色的系统提示词；角色不存在时返回 None。"""
+        role = find_role_by_name(await self.roles(), name)
+        if role is None:
+            # 可能是刚新建的角色，强制刷新一次
+            role = find_role_by_name(await self.roles(refresh=True), name)
+            if role is None:
+                return None
+        key = str(role.get("role_id"))
+        version = role.get("hash")
+        cached = self._prompts.get(key)
+        if cached is not None and version is not None and cached[0] == version:
+            return cached[1]
+        if "description" not in role and role.get("role_id") is not None:
+            assert self.session is not None
+            url = f"{self.base_url}/webapi/roles/{role['role_id']}"
+            async with self.scheduler.aslot("interactive"), self.session.get(url) as r:
+                r.raise_for_status()
+                body = await r.json(content_type=None)
+            role = {**role, **(body if isinstance(body, dict) else {})}
+        prompt = build_system_prompt(role)
+        self._prompts[key] = (version, prompt)
+        return prompt
+
+    # -------------------- 路由 -------------------- #
+    async def handle_models(self, _request: web.Request) -> web.Response:
+        try:
+            roles = await self.roles()
+        except Exception as e:
+            return openai_error(502, f"fetch roles failed: {e}", err_type="upstream_error")
+        created = int(time.time())
+        data = [
+            {"id": f"{ROLE_PREFIX}{r.get('name')}", "object": "model", "created": created, "owned_by": "lobechat-role"}
+            for r in roles
+            if r.get("name")
+        ]
+        return web.json_response({"object": "list", "data": data})
+
+    async def handle_chat(self, request: web.Request) -> web.StreamResponse:
+        try:
+            body = await request.json()
+        except Exception:
+            return openai_error(400, "request body must be JSON")
+        if not isinstance(body, dict) or not isinstance(body.get("messages"), list) or not body.get("model"):
+            return openai_error(400, "model and messages are required")
+
+        priority = str(request.headers.get("X-Priority") or body.get("priority") or "interactive").strip().lower()
+        if priority not in PRIORITY_CLASSES:
+            return openai_error(400, f"priority must be one of {', '.join(PRIORITY_CLASSES)}", code="invalid_priority")
+
+        model = str(body["model"])
+        role_name, upstream_model = parse_model(model, self.model)
+        messages: List[Dict[str, Any]] = body["messages"]
+        if role_name is not None:
+            try:
+                prompt = await self.system_prompt(role_name)
+            except Exception as e:
+                return openai_error(502, f"fetch role failed: {e}", err_type="upstream_error")
+            if prompt is None:
+                return openai_error(404, f"Role not found: {role_name}", code="model_not_found")
+            if prompt:
+                messages = [{"role": "system", "content": prompt}, *messages]
+
+        user_id = str(body.get("user") or request.headers.get("X-User-Id") or self.default_user)
+        try:
+            headers = self.auth_headers(user_id)
+        except RuntimeError as e:
+            return openai_error(500, str(e), err_type="server_error")
+
+        stream = bool(body.get("stream"))
+        payload: Dict[str, Any] = {"model": upstream_model, "messages": messages, "stream": stream}
+        for field in PASSTHROUGH_FIELDS:
+            if field in body:
+                payload[field] = body[field]
+
+        assert self.session is not None
+        url = f"{self.base_url}/webapi/chat/{request.match_info.get('provider') or self.provider}"
+        try:
+            body_bytes, extra_headers = encode_body(payload, self.compress_min_bytes)
+            # 名额一直占用到流式回复结束
+            async with self.scheduler.aslot(priority), self.session.post(
+                url, data=body_bytes, headers={**headers, **extra_headers}
+            ) as upstream:
+                if upstream.status >= 400:
+                    text = await upstream.text()
+                    return openai_error(upstream.status, f"HTTP {upstream.status} | {text}", err_type="upstream_error")
+                completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+                if stream:
+                    include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+                    return await self._relay_stream(request, upstream, completion_id, model, messages, include_usage)
+                return await self._aggregate(upstream, completion_id, model)
+        except aiohttp.ClientError as e:
+            return openai_error(502, f"upstream request failed: {e}", err_type="upstream_error")
+
+    async def _relay_stream(
+        self,
+        request: web.Request,
+        upstream: aiohttp.ClientResponse,
+        completion_id: str,
+        model: str,
+        messages: List[Dict[str, Any]],
+        include_usage: bool,
+    ) -> web.StreamResponse:
+        created = int(time.time())
+        head = json.dumps({"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model}, ensure_ascii=False)[:-1]
+        # 每个正文片段只需编码文本本身，其余部分预先编码好
+        prefix = f'data: {head},"choices":[{{"index":0,"delta":{{"content":'.encode("utf-8")
+        suffix = b'},"finish_reason":null}]}\n\n'
+
+        def frame(choices: List[Dict[str, Any]], **extra: Any) -> bytes:
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model, "choices": choices, **extra}
+            return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8")
+
+        async def start() -> web.StreamResponse:
+            # 响应头推迟到第一个事件才发送，这样开头就出错时还能返回带状态码的错误
+            started = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+            await started.prepare(request)
+            await started.write(frame([{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}]))
+            return started
+
+        resp: Optional[web.StreamResponse] = None
+        meta: Dict[str, Any] = {}
+        has_tool_calls = False
+        error: Optional[StreamError] = None
+        try:
+            async for kind, value in iter_sse_events(upstream, meta):
+                if resp is None:
+                    resp = await start()
+                if kind == "text":
+                    await resp.write(prefix + json.dumps(value, ensure_ascii=False).encode("utf-8") + suffix)
+                else:
+                    has_tool_calls = True
+                    await resp.write(frame([{"index": 0, "delta": {"tool_calls": value}, "finish_reason": None}]))
+        except ConnectionResetError:
+            # 下游断开：异常照常抛出，退出 async with 时释放上游连接
+            raise
+        except StreamError as e:
+            error = e
+        except aiohttp.ClientError as e:
+            print(f"[warn] upstream stream aborted: {e}", file=sys.stderr)
+            error = StreamError(f"upstream stream aborted: {e}")
+
+        if error is not None:
+            if resp is None:
+                return openai_error(502, str(error), code=error.code, err_type="upstream_error")
+            # 已经开始输出：与 OpenAI 一样发送 error 块后直接结束，不伪装成正常的 stop
+            err = {"error": {"message": str(error), "type": "upstream_error", "code": error.code}}
+            await resp.write(f"data: {json.dumps(err, ensure_ascii=False)}\n\n".encode("utf-8"))
+            await resp.write_eof()
+            return resp
+
+        if resp is None:
+            resp = await start()
+        await resp.write(frame([{"index": 0, "delta": {}, "finish_reason": finish_reason(meta, has_tool_calls)}]))
+        if include_usage:
+            usage = meta.get("usage") or {}
+            prompt_tokens = usage.get("prompt_tokens", 0)
+            completion_tokens = usage.get("completion_tokens", 0)
+            await resp.write(
+                frame(
+                    [],
+                    usage={
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens,
+                    },
+                )
+            )
+        await resp.write(b"data: [DONE]\n\n")
+        await resp.write_eof()
+        return resp
+
+    async def _aggregate(self, upstream: aiohttp.ClientResponse, completion_id: str, model: str) -> web.Response:
+        usage: Optional[Dict[str, Any]] = None
+        if upstream.content_type == "text/event-stream":
+            # 聊天接口即使 stream=false 也可能以 SSE 返回：聚合全部片段
+            meta: Dict[str, Any] = {}
+            parts: List[str] = []
+            calls: Dict[int, Dict[str, Any]] = {}
+            try:
+                async for kind, value in iter_sse_events(upstream, meta):
+                    if kind == "text":
+                        parts.append(value)
+                    else:
+                        merge_tool_calls(calls, value)
+            except StreamError as e:
+                return openai_error(502, str(e), code=e.code, err_type="upstream_error")
+            tool_calls = [calls[i] for i in sorted(calls)]
+            return self._completion(
+                completion_id, model, "".join(parts), meta.get("usage"), tool_calls, finish_reason(meta, bool(tool_calls))
+            )
+        text = await upstream.text()
+        content = text
+        try:
+            obj = json.loads(text)
+            if isinstance(obj, dict):
+                if isinstance(obj.get("usage"), dict):
+                    usage = normalize_usage(obj["usage"])
+                content = obj.get("content") or obj.get("delta") or text
+                choices = obj.get("choices")
+                if isinstance(choices, list) and choices and isinstance(choices[0], dict):
+                    content = (choices[0].get("message") or {}).get("content") or content
+        except Exception:
+            pass
+        return self._completion(completion_id, model, content, usage)
+
+    @staticmethod
+    def _completion(
+        completion_id: str,
+        model: str,
+        content: str,
+        usage: Optional[Dict[str, Any]],
+        tool_calls: Optional[List[Dict[str, Any]]] = None,
+        finish: str = "stop",
+    ) -> web.Response:
+        message: Dict[str, Any] = {"role": "assistant", "content": content}
+        if tool_calls:
+            message = {"role": "assistant", "content": content or None, "tool_calls": tool_calls}
+        result: Dict[str, Any] = {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": message, "finish_reason": finish}],
+        }
+        if usage:
+            result["usage"] = {
+                "prompt_tokens": usage["prompt_tokens"],
+                "completion_tokens": usage["completion_tokens"],
+                "total_tokens": usage["prompt_tokens"] + usage["completion_tokens"],
+            }
+        return web.json_response(result, dumps=lambda o: json.dumps(o, ensure_ascii=False))
+
+
+def create_app(gateway: Gateway, api_key: Optional[str] = None) -> web.Application:
+    @web.middleware
+    async def check_key(request: web.Request, handler: Any) -> web.StreamResponse:
+        if api_key and request.headers.get("Authorization") != f"Bearer {api_key}":
+            return openai_error(401, "Invalid API key", code="invalid_api_key")
+        return await handler(request)
+
+    app = web.Application(middlewares=[check_key])
+    app.on_startup.append(gateway.start)
+    app.on_cleanup.append(gateway.close)
+    app.router.add_get("/v1/models", gateway.handle_models)
+    app.router.add_post("/v1/chat/completions", gateway.handle_chat)
+    # 按路径指定 provider：/v1/{provider}/chat/completions
+    app.router.add_post("/v1/{provider}/chat/completions", gateway.handle_chat)
+    return app
+
+
+# -------------------- 命令行 CLI -------------------- #
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve LobeChat roles as OpenAI-compatible models")
+    parser.add_argument("--base", default=DEFAULT_BASE_URL, help="LobeChat base URL")
+    parser.add_argument("--host", default="127.0.0.1", help="Listen address, default: 127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787, help="Listen port, default: 8787")
+    parser.add_argument("--user", default="PY_GATEWAY", help="User ID for auth payload when the request names none")
+    parser.add_argument("--provider", default=DEFAULT_PROVIDER, help="Provider, default: openai")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Upstream model for role:<name>, default: gpt-5-mini")
+    parser.add_argument("--pool-size", type=int, default=64, help="Max pooled upstream connections, default: 64")
+    parser.add_argument("--roles-ttl", type=float, default=ROLES_TTL, help="Seconds to cache the role list, default: 30")
+    parser.add_argument("--compress-min-bytes", type=int, default=0, help="Gzip upstream chat bodies at least this large (0 = off)")
+    parser.add_argument("--api-key", help="Require clients to send this key as a Bearer token")
+
+    args = parser.parse_args()
+
+    load_env_from_dotenv()
+    # 在途的上游对话最多与连接池一样多
+    scheduler = default_scheduler()
+    scheduler.set_cap("interactive", max(1, args.pool_size))
+    gateway = Gateway(
+        args.base,
+        args.provider,
+        args.model,
+        args.user,
+        pool_size=max(1, args.pool_size),
+        roles_ttl=args.roles_ttl,
+        compress_min_bytes=args.compress_min_bytes,
+        scheduler=scheduler,
+    )
+    web.run_app(create_app(gateway, args.api_key), host=args.host, port=args.port, print=lambda msg: print(msg, file=sys.stderr))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+进程内请求调度器：让交互式对话与批量流量共用同一个进程 / 同一个 LobeChat 节点时互不拖累。
+- 三个优先级：interactive（在线对话）、background（目录刷新、预取等）、bulk（批量评测、角色同步）
+- 加权公平排队：每个请求按所属类别的权重分配虚拟完成时间，按虚拟时间从小到大放行
+- 并发上限：全局上限 + 每个类别各自的上限；全局上限中固定保留 reserve 个名额只给 interactive
+- 自动让行：interactive 排队等待超过阈值后暂停放行新的 bulk 请求，直到 interactive 队列清空（最长保持 yield_hold）
+- stats() 输出各类别的排队数、在途数与排队等待时间分布（毫秒）
+- asyncio 代码用 aslot()：排队不占用线程，也不阻塞事件循环
+
+用法：
+  from request_scheduler import default_scheduler
+  with default_scheduler().slot("bulk"):
+      ...  # 发出请求
+  async with default_scheduler().aslot("interactive"):
+      ...  # 发出请求
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterator, List, Optional
+
+PRIORITY_CLASSES = ("interactive", "background", "bulk")
+DEFAULT_LIMIT = 16  # 全局并发上限
+DEFAULT_WEIGHTS = {"interactive": 8.0, "background": 2.0, "bulk": 1.0}
+DEFAULT_CAPS = {"interactive": 16, "background": 4, "bulk": 4}
+INTERACTIVE_RESERVE = 4  # 全局上限中只留给 interactive 的名额，bulk / background 再多也占不满
+YIELD_WAIT = 0.05  # 秒；interactive 排队超过该时长即认为出现拥塞
+YIELD_HOLD = 2.0  # 秒；拥塞后 bulk 暂停放行的最长时长（期间再次拥塞会顺延，interactive 队列清空即结束）
+WAIT_SAMPLES = 1024  # 每个类别保留的最近等待样本数
+
+
+class _Waiter:
+    __slots__ = ("cls", "tag", "enqueued", "admitted", "notify")
+
+    def __init__(self, cls: str, tag: float, enqueued: float, notify: Optional[Callable[[], None]] = None) -> None:
+        self.cls = cls
+        self.tag = tag
+        self.enqueued = enqueued
+        self.admitted = False
+        # 放行时调用（持锁状态下）；线程等待者为 None，靠条件变量唤醒
+        self.notify = notify
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return round(sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo), 1)
+
+
+class RequestScheduler:
+    """线程安全；acquire() 阻塞直到放行，release() 归还名额。通常用 slot() / aslot() 上下文管理器。"""
+
+    def __init__(
+        self,
+        limit: int = DEFAULT_LIMIT,
+        weights: Optional[Dict[str, float]] = None,
+        caps: Optional[Dict[str, int]] = None,
+        reserve: int = INTERACTIVE_RESERVE,
+        yield_wait: float = YIELD_WAIT,
+        yield_hold: float = YIELD_HOLD,
+    ) -> None:
+        self.limit = max(1, limit)
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.caps = {**DEFAULT_CAPS, **(caps or {})}
+        self.reserve = min(max(0, reserve), self.limit - 1)
+        self.yield_wait = yield_wait
+        self.yield_hold = yield_hold
+
+        self._cond = threading.Condition()
+        self._queues: Dict[str, Deque[_Waiter]] = {c: deque() for c in PRIORITY_CLASSES}
+        self._inflight = {c: 0 for c in PRIORITY_CLASSES}
+        self._last_tag = {c: 0.0 for c in PRIORITY_CLASSES}
+        self._vtime = 0.0
+        self._yield_until = 0.0
+        self._yield_events = 0
+        self._submitted = {c: 0 for c in PRIORITY_CLASSES}
+        self._waits: Dict[str, Deque[float]] = {c: deque(maxlen=WAIT_SAMPLES) for c in PRIORITY_CLASSES}
+
+    def set_cap(self, cls: str, cap: int) -> None:
+        """调整类别上限；全局上限随之放大，但始终为 interactive 留出 reserve 个名额。"""
+        self._check(cls)
+        with self._cond:
+            self.caps[cls] = max(1, cap)
+            reserve = 0 if cls == "interactive" else self.reserve
+            self.limit = max(self.limit, self.caps[cls] + reserve)
+            self._dispatch(time.monotonic())
+
+    @contextmanager
+    def slot(self, cls: str = "interactive") -> Iterator[float]:
+        """占用一个名额直到退出；产出排队等待秒数。"""
+        waited = self.acquire(cls)
+        try:
+            yield waited
+        finally:
+            self.release(cls)
+
+    @asynccontextmanager
+    async def aslot(self, cls: str = "interactive") -> AsyncIterator[float]:
+        """slot() 的 asyncio 版本。"""
+        waited = await self.acquire_async(cls)
+        try:
+            yield waited
+        finally:
+            self.release(cls)
+
+    def acquire(self, cls: str = "interactive") -> float:
+        self._check(cls)
+        with self._cond:
+            waiter = self._enqueue(cls)
+            try:
+                while not waiter.admitted:
+                    # 让行期结束时需要自行醒来重新调度
+                    remaining = self._yield_until - time.monotonic()
+                    self._cond.wait(timeout=remaining if remaining > 0 else None)
+                    self._dispatch(time.monotonic())
+            except BaseException:
+                # 等待中被中断（如 Ctrl-C）
+                self._abandon(waiter)
+                raise
+            return self._record_wait(waiter)
+
+    async def acquire_async(self, cls: str = "interactive") -> float:
+        self._check(cls)
+        loop = asyncio.get_running_loop()
+        admitted = loop.create_future()
+
+        def wake() -> None:
+            if not admitted.done():
+                admitted.set_result(None)
+
+        with self._cond:
+            waiter = self._enqueue(cls, lambda: loop.call_soon_threadsafe(wake))
+            remaining = self._yield_until - time.monotonic()
+        try:
+            while not admitted.done():
+                try:
+                    await asyncio.wait_for(asyncio.shield(admitted), timeout=remaining if remaining > 0 else None)
+                except asyncio.TimeoutError:
+                    # 让行期结束：重新调度
+                    with self._cond:
+                        self._dispatch(time.monotonic())
+                        remaining = self._yield_until - time.monotonic()
+        except BaseException:
+            # 等待中被取消（如下游断开）
+            with self._cond:
+                self._abandon(waiter)
+            raise
+        with self._cond:
+            return self._record_wait(waiter)
+
+    def release(self, cls: str = "interactive") -> None:
+        with self._cond:
+            self._inflight[cls] -= 1
+            self._dispatch(time.monotonic())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            now = time.monotonic()
+            classes: Dict[str, Any] = {}
+            for cls in PRIORITY_CLASSES:
+                waits = sorted(self._waits[cls])
+                classes[cls] = {
+                    "queued": len(self._queues[cls]),
+                    "inflight": self._inflight[cls],
+                    "cap": self.caps[cls],
+                    "weight": self.weights[cls],
+                    "submitted": self._submitted[cls],
+                    "wait_ms": {
+                        "mean": round(sum(waits) / len(waits), 1) if waits else 0.0,
+                        "p50": _percentile(waits, 0.50),
+                        "p95": _percentile(waits, 0.95),
+                        "max": round(waits[-1], 1) if waits else 0.0,
+                    },
+                }
+            return {
+                "limit": self.limit,
+                "reserve": self.reserve,
+                "bulk_yielding": now < self._yield_until,
+                "yield_events": self._yield_events,
+                "classes": classes,
+            }
+
+    # -------------------- 内部 -------------------- #
+    def _check(self, cls: str) -> None:
+        if cls not in self._queues:
+            raise ValueError(f"unknown priority class: {cls} (expected one of {', '.join(PRIORITY_CLASSES)})")
+
+    def _enqueue(self, cls: str, notify: Optional[Callable[[], None]] = None) -> _Waiter:
+        """在持锁状态下调用：入队并尝试立即放行。"""
+        enqueued = time.monotonic()
+        # 空闲一段时间的类别从当前虚拟时间起算，不能攒下额度
+        tag = max(self._vtime, self._last_tag[cls]) + 1.0 / self.weights[cls]
+        self._last_tag[cls] = tag
+        waiter = _Waiter(cls, tag, enqueued, notify)
+        self._queues[cls].append(waiter)
+        self._submitted[cls] += 1
+        self._dispatch(enqueued)
+        return waiter
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        """在持锁状态下调用：撤销排队，或归还已拿到的名额。"""
+        if waiter.admitted:
+            self._inflight[waiter.cls] -= 1
+        else:
+            self._queues[waiter.cls].remove(waiter)
+        self._dispatch(time.monotonic())
+
+    def _record_wait(self, waiter: _Waiter) -> float:
+        waited = time.monotonic() - waiter.enqueued
+        self._waits[waiter.cls].append(waited * 1000)
+        return waited
+
+    def _start_yield(self, now: float) -> None:
+        if now >= self._yield_until:
+            self._yield_events += 1
+        self._yield_until = max(self._yield_until, now + self.yield_hold)
+
+    def _dispatch(self, now: float) -> None:
+        """在持锁状态下调用：按虚拟时间放行尽可能多的等待者。"""
+        interactive = self._queues["interactive"]
+        if not interactive:
+            # 没有 interactive 在排队就不必继续让行
+            self._yield_until = min(self._yield_until, now)
+        elif now - interactive[0].enqueued > self.yield_wait:
+            self._start_yield(now)
+        yielding = now < self._yield_until
+
+        admitted = False
+        while sum(self._inflight.values()) < self.limit:
+            # interactive 以外的类别合计最多占用 limit - reserve 个名额
+            shared_full = sum(n for c, n in self._inflight.items() if c != "interactive") >= self.limit - self.reserve
+            best: Optional[Deque[_Waiter]] = None
+            for cls, queue in self._queues.items():
+                if not queue or self._inflight[cls] >= self.caps[cls]:
+                    continue
+                if cls != "interactive" and shared_full:
+                    continue
+                if cls == "bulk" and yielding:
+                    continue
+                if best is None or queue[0].tag < best[0].tag:
+                    best = queue
+            if best is None:
+                break
+            waiter = best.popleft()
+            waiter.admitted = True
+            self._inflight[waiter.cls] += 1
+            self._vtime = max(self._vtime, waiter.tag)
+            if waiter.notify is not None:
+                waiter.notify()
+            admitted = True
+        if admitted:
+            self._cond.notify_all()
+
+
+_default: Optional[RequestScheduler] = None
+_default_lock = threading.Lock()
+
+
+def default_scheduler() -> RequestScheduler:
+    """进程内共享的调度器：同一进程里的所有客户端与脚本请求都经由它排队。"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = RequestScheduler()
+        return _default
@@ -8,30 +8,53 @@
 - personality 在创建/更新时按 name 稳定随机生成（多次运行不抖动）
 - OPEN 会在浏览器打开该角色对话；若角色不存在则先创建再打开
 
+- create/update/delete 按批提交到 /webapi/roles/bulk（服务端没有该接口时自动回退为逐条请求）
+- 大批量操作可改用外部清单（CSV 或 JSONL，每行 op,name,description；op 为 create/update/delete/open），
+  清单按块流式读取并直接交给执行器，内存占用与清单大小无关，运行中持续输出进度与吞吐
+
 环境变量：
 - LOBECHAT_BASE：后端地址（默认 http://localhost:3010）
 
 用法：
 - 直接运行：python scripts/roles_batch_ops_v2.py
 - 如需修改后端地址（PowerShell）：$env:LOBECHAT_BASE="http://localhost:3010"
+- 使用清单：python scripts/roles_batch_ops_v2.py --manifest ops.csv
+            python scripts/roles_batch_ops_v2.py --manifest ops.jsonl
+            cat ops.jsonl | python scripts/roles_batch_ops_v2.py --manifest - --format jsonl
 """
 from __future__ import annotations
 
+import csv
+import io
+import itertools
+import gzip
 import json
 import os
 import sys
+import time
 import random
 import hashlib
 import urllib.request
 import urllib.error
+import zlib
 import webbrowser
 from dataclasses import dataclass
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+try:
+    import brotli  # 可选：安装后可接收 br 压缩的响应
+except ImportError:
+    brotli = None
 
 # ======================= 基本配置（在此处编辑） ======================= #
 BASE = os.environ.get("LOBECHAT_BASE", "http://localhost:3020").rstrip("/")
 OPEN_BROWSER = True  # 处理 OPEN 列表时是否自动打开浏览器
 TIMEOUT = 15
+MANIFEST_CHUNK = 1000  # 清单每次读取的行数
+PROGRESS_INTERVAL = 2.0  # 秒；进度输出间隔
+BULK_MAX_OPS = 200  # 单个批量请求的最大操作数（服务端上限 500）
+BULK_MAX_BYTES = 512 * 1024  # 单个批量请求的最大请求体字节数
+ACCEPT_ENCODING = "br, gzip" if brotli is not None else "gzip"
 
 # 在下方四个列表中填写你的批量操作数据（仅需 name 与 description）
 # 示例：
@@ -60,10 +83,23 @@ class Role:
     personality: Any | None = None
 
 
+def _decode_body(raw: bytes, encoding: str | None) -> bytes:
+    enc = (encoding or "").strip().lower()
+    if enc == "gzip":
+        return gzip.decompress(raw)
+    if enc == "deflate":
+        return zlib.decompress(raw)
+    if enc == "br" and brotli is not None:
+        return brotli.decompress(raw)
+    return raw
+
+
 def _request(method: str, path: str, data: Dict[str, Any] | None = None) -> Tuple[int, Any]:
     url = BASE + path
     req = urllib.request.Request(url=url, method=method)
     req.add_header("Accept", "application/json")
+    # 角色描述多为长中文文本，压缩后体积通常只有原来的 1/3
+    req.add_header("Accept-Encoding", ACCEPT_ENCODING)
     body = None
     if data is not None:
         req.add_header("Content-Type", "application/json")
@@ -71,7 +107,7 @@ def _request(method: str, path: str, data: Dict[str, Any] | None = None) -> Tupl
     try:
         with urllib.request.urlopen(req, data=body, timeout=TIMEOUT) as resp:
             status = resp.status
-            raw = resp.read()
+            raw = _decode_body(resp.read(), resp.headers.get("Content-Encoding"))
             text = raw.decode("utf-8", errors="replace")
             try:
                 payload = json.loads(text)
@@ -80,7 +116,7 @@ def _request(method: str, path: str, data: Dict[str, Any] | None = None) -> Tupl
             return status, payload
     except urllib.error.HTTPError as e:
         try:
-            err_text = e.read().decode("utf-8", errors="replace")
+            err_text = _decode_body(e.read(), e.headers.get("Content-Encoding")).decode("utf-8", errors="replace")
             err_json = json.loads(err_text)
         except Exception:
             err_json = {"error": str(e)}
@@ -90,7 +126,8 @@ def _request(method: str, path: str, data: Dict[str, Any] | None = None) -> Tupl
 
 
 def _fetch_all_roles() -> List[Role]:
-    st, payload = _request("GET", "/webapi/roles")
+    # 只需要 name -> role_id 的索引，不下载 description（旧版服务端会忽略 fields 返回完整列表）
+    st, payload = _request("GET", "/webapi/roles?fields=role_id,name")
     if st != 200 or not isinstance(payload, list):
         print(json.dumps({"error": f"拉取现有角色失败(status={st})"}, ensure_ascii=False), file=sys.stderr)
         return []
@@ -114,6 +151,26 @@ def _index_by_name(roles: List[Role]) -> Dict[str, Role]:
     return idx
 
 
+# ------------------ 批量接口 ------------------ #
+_bulk_supported: bool | None = None  # None：尚未探测；False：服务端无 /webapi/roles/bulk
+
+
+def _bulk_request(ops: List[Dict[str, Any]]) -> List[Dict[str, Any]] | None:
+    """一次提交多个 create/update/delete；服务端不支持时返回 None，由调用方逐条回退。"""
+    global _bulk_supported
+    if _bulk_supported is False:
+        return None
+    st, res = _request("POST", "/webapi/roles/bulk", {"ops": ops})
+    if st in (404, 405):
+        _bulk_supported = False
+        return None
+    results = res.get("results") if isinstance(res, dict) else None
+    if st != 200 or not isinstance(results, list) or len(results) != len(ops):
+        raise RuntimeError(f"批量请求失败(status={st}): {res}")
+    _bulk_supported = True
+    return results
+
+
 # ------------------ personality（按 name 稳定随机） ------------------ #
 STYLES = ["concise", "friendly", "formal", "humorous", "analytical"]
 TONES = ["neutral", "positive", "curious", "confident", "warm"]
@@ -155,7 +212,10 @@ def update_role(idx: Dict[str, Role], name: str, description: str | None) -> Rol
     if name not in idx:
         raise RuntimeError(f"更新失败：未找到角色 '{name}'")
     role = idx[name]
-    patch = {"description": description or role.description, "personality": generate_personality(name)}
+    patch: Dict[str, Any] = {"personality": generate_personality(name)}
+    if description:
+        # 未提供 description 时保持服务端原值
+        patch["description"] = description
     st, res = _request("PUT", f"/webapi/roles/{role.role_id}", patch)
     if st != 200 or not isinstance(res, dict):
         raise RuntimeError(f"更新失败 {name}: {res}")
@@ -193,6 +253,231 @@ def open_role(idx: Dict[str, Role], name: str, description_hint: str | None) ->
         webbrowser.open(full)
 
 
+# ------------------ 操作清单 ------------------ #
+OPS = ("create", "update", "delete", "open")
+_DONE_KEYS = {"create": "created", "update": "updated", "delete": "deleted", "open": "opened"}
+Op = Tuple[str, str, str | None]  # (op, name, description)
+
+
+def _ops_from_lists() -> Iterator[Op]:
+    # 脚本顶部四个列表按 CREATE -> UPDATE -> DELETE -> OPEN 的顺序执行
+    for item in CREATE:
+        yield "create", str(item.get("name", "")).strip(), item.get("description")
+    for item in UPDATE:
+        yield "update", str(item.get("name", "")).strip(), item.get("description")
+    for name in DELETE:
+        yield "delete", str(name).strip(), None
+    for name in OPEN:
+        yield "open", str(name).strip(), None
+
+
+def iter_manifest(path: str, fmt: str | None = None) -> Iterator[Op]:
+    """逐行读取 CSV（表头需含 op,name[,description]）或 JSONL 清单；path 为 - 时读取标准输入。"""
+    if not fmt:
+        ext = os.path.splitext(path)[1].lower()
+        fmt = "csv" if ext == ".csv" else "jsonl"
+    if path == "-":
+        f = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig")
+    else:
+        f = open(path, "r", encoding="utf-8-sig", newline="")
+    with f:
+        if fmt == "csv":
+            for lineno, row in enumerate(csv.DictReader(f), 2):
+                op = (row.get("op") or "").strip().lower()
+                if op not in OPS:
+                    print(json.dumps({"manifest_error": {"line": lineno, "error": f"未知 op: {op}"}}, ensure_ascii=False), file=sys.stderr)
+                    continue
+                yield op, (row.get("name") or "").strip(), row.get("description")
+            return
+        for lineno, raw in enumerate(f, 1):
+            line = raw.strip()
+            if not line:
+                continue
+            try:
+                obj = json.loads(line)
+                op = str(obj.get("op", "")).strip().lower()
+            except Exception as e:
+                print(json.dumps({"manifest_error": {"line": lineno, "error": str(e)}}, ensure_ascii=False), file=sys.stderr)
+                continue
+            if op not in OPS:
+                print(json.dumps({"manifest_error": {"line": lineno, "error": f"未知 op: {op}"}}, ensure_ascii=False), file=sys.stderr)
+                continue
+            desc = obj.get("description")
+            yield op, str(obj.get("name", "")).strip(), desc if isinstance(desc, str) else None
+
+
+def _chunks(ops: Iterable[Op], size: int) -> Iterator[List[Op]]:
+    it = iter(ops)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def execute_op(idx: Dict[str, Role], op: str, name: str, description: str | None) -> Dict[str, Any] | str:
+    """执行单个操作，返回写入汇总的条目（open/delete 为名称）。"""
+    if op == "create":
+        r = create_role_if_absent(idx, name, description)
+        return {"name": r.name, "role_id": r.role_id}
+    if op == "update":
+        r = update_role(idx, name, description)
+        return {"name": r.name, "role_id": r.role_id}
+    if op == "delete":
+        delete_role(idx, name)
+        return name
+    open_role(idx, name, description)
+    return name
+
+
+def _plan_bulk_op(idx: Dict[str, Role], op: str, name: str, description: str | None) -> Dict[str, Any] | None:
+    """
+    把一个操作转换为批量接口的请求项；与 create_role_if_absent / update_role / delete_role 的语义一致。
+    无需请求服务端时返回 None（已存在的 create、不存在的 delete）。
+    """
+    if op == "create":
+        if name in idx:
+            return None
+        return {"op": "create", "name": name, "description": description or "", "personality": generate_personality(name)}
+    if op == "update":
+        if name not in idx:
+            raise RuntimeError(f"更新失败：未找到角色 '{name}'")
+        item = {"op": "update", "role_id": idx[name].role_id, "personality": generate_personality(name)}
+        if description:
+            item["description"] = description
+        return item
+    if name not in idx:
+        print(f"跳过删除：未找到 '{name}'")
+        return None
+    return {"op": "delete", "role_id": idx[name].role_id}
+
+
+def run_ops(idx: Dict[str, Role], ops: Iterable[Op], collect: bool = True) -> Dict[str, Any]:
+    """
+    按块消费操作流并执行。create/update/delete 攒成受条数与字节数限制的批次提交到批量接口，
+    open 以及依赖同批内前序操作的条目会先把已攒的批次提交。
+    collect=True 时汇总每个成功条目（与列表模式的输出一致）；清单模式下仅计数，保证内存占用恒定。
+    """
+    done: Dict[str, Any] = {key: [] if collect else 0 for key in _DONE_KEYS.values()}
+    processed = errors = 0
+    started = last_report = time.monotonic()
+
+    pending: List[Tuple[str, str, str | None, Dict[str, Any]]] = []  # (op, name, description, 请求项)
+    pending_names: set = set()
+    pending_bytes = 0
+
+    def record(op: str, res: Any) -> None:
+        key = _DONE_KEYS[op]
+        if collect:
+            done[key].append(res)
+        else:
+            done[key] += 1
+
+    def fail(op: str, name: str, err: Any) -> None:
+        nonlocal errors
+        errors += 1
+        print(json.dumps({f"{op}_error": {"name": name, "error": str(err)}}, ensure_ascii=False), file=sys.stderr)
+
+    def run_single(op: str, name: str, desc: str | None) -> None:
+        try:
+            record(op, execute_op(idx, op, name, desc))
+        except Exception as e:
+            fail(op, name, e)
+
+    def flush() -> None:
+        nonlocal pending, pending_bytes
+        batch, pending, pending_bytes = pending, [], 0
+        pending_names.clear()
+        if not batch:
+            return
+        try:
+            results = _bulk_request([item for *_, item in batch])
+        except Exception as e:
+            for op, name, _, _ in batch:
+                fail(op, name, e)
+            return
+        if results is None:
+            # 服务端没有批量接口：逐条回退
+            for op, name, desc, _ in batch:
+                run_single(op, name, desc)
+            return
+        for (op, name, _, _), res in zip(batch, results):
+            if not isinstance(res, dict) or res.get("status") not in (200, 201):
+                fail(op, name, res.get("message") if isinstance(res, dict) else res)
+                continue
+            if op == "delete":
+                print(f"已删除: {name} (role_id={idx[name].role_id})")
+                del idx[name]
+                record(op, name)
+                continue
+            data = res.get("role") or {}
+            role = Role(role_id=int(data.get("role_id")), name=data.get("name"), description=data.get("description"), personality=data.get("personality"))
+            idx[name] = role
+            print(f"{'已创建' if op == 'create' else '已更新'}: {role.name} (role_id={role.role_id})")
+            record(op, {"name": role.name, "role_id": role.role_id})
+
+    for chunk in _chunks(ops, MANIFEST_CHUNK):
+        for op, name, desc in chunk:
+            processed += 1
+            if not name:
+                print(f"跳过 {op}：name 为空", file=sys.stderr)
+                continue
+            # open 需要最新的 role_id，同名操作需要看到前一个操作的结果
+            if op == "open" or name in pending_names:
+                flush()
+            if op == "open":
+                run_single(op, name, desc)
+                continue
+            try:
+                item = _plan_bulk_op(idx, op, name, desc)
+            except Exception as e:
+                fail(op, name, e)
+                continue
+            if item is None:
+                record(op, {"name": name, "role_id": idx[name].role_id} if op == "create" else name)
+                continue
+            n = len(json.dumps(item, ensure_ascii=False).encode("utf-8"))
+            if pending and (len(pending) >= BULK_MAX_OPS or pending_bytes + n > BULK_MAX_BYTES):
+                flush()
+            pending.append((op, name, desc, item))
+            pending_names.add(name)
+            pending_bytes += n
+        flush()
+
+        now = time.monotonic()
+        if not collect and now - last_report >= PROGRESS_INTERVAL:
+            last_report = now
+            rate = processed / max(now - started, 1e-9)
+            print(json.dumps({"progress": {"processed": processed, "errors": errors, "ops_per_s": round(rate, 1)}}), file=sys.stderr)
+
+    elapsed = time.monotonic() - started
+    if not collect:
+        done["processed"] = processed
+        done["errors"] = errors
+        done["elapsed_s"] = round(elapsed, 1)
+        done["ops_per_s"] = round(processed / max(elapsed, 1e-9), 1)
+    return done
+
+
+def parse_argv(argv: List[str]) -> Dict[str, Any]:
+    # 极简解析，与 roles_sync 保持一致
+    manifest = None
+    fmt = None
+    i = 0
+    while i < len(argv):
+        a = argv[i]
+        if a == "--manifest" and i + 1 < len(argv):
+            manifest = argv[i + 1]
+            i += 2
+            continue
+        if a == "--format" and i + 1 < len(argv):
+            fmt = argv[i + 1].lower()
+            i += 2
+            continue
+        i += 1
+    return {"manifest": manifest, "format": fmt}
+
+
 # ------------------ 主流程 ------------------ #
 
 def main() -> int:
@@ -203,67 +488,18 @@ def main() -> int:
         print(json.dumps({"error": str(e)}, ensure_ascii=False), file=sys.stderr)
         return 1
 
-    created, updated, deleted, opened = [], [], [], []
-
-    # 1) CREATE
-    for item in CREATE:
-        name = str(item.get("name", "")).strip()
-        if not name:
-            print("跳过创建：name 为空", file=sys.stderr)
-            continue
-        desc = item.get("description")
+    args = parse_argv(sys.argv[1:])
+    if args["manifest"]:
         try:
-            r = create_role_if_absent(idx, name, desc)
-            created.append({"name": r.name, "role_id": r.role_id})
-        except Exception as e:
-            print(json.dumps({"create_error": {"name": name, "error": str(e)}}, ensure_ascii=False), file=sys.stderr)
-
-    # 2) UPDATE
-    for item in UPDATE:
-        name = str(item.get("name", "")).strip()
-        if not name:
-            print("跳过更新：name 为空", file=sys.stderr)
-            continue
-        desc = item.get("description")
-        try:
-            r = update_role(idx, name, desc)
-            updated.append({"name": r.name, "role_id": r.role_id})
-        except Exception as e:
-            print(json.dumps({"update_error": {"name": name, "error": str(e)}}, ensure_ascii=False), file=sys.stderr)
-
-    # 3) DELETE
-    for name in DELETE:
-        name = str(name).strip()
-        if not name:
-            print("跳过删除：name 为空", file=sys.stderr)
-            continue
-        try:
-            delete_role(idx, name)
-            deleted.append(name)
-        except Exception as e:
-            print(json.dumps({"delete_error": {"name": name, "error": str(e)}}, ensure_ascii=False), file=sys.stderr)
-
-    # 4) OPEN
-    for name in OPEN:
-        name = str(name).strip()
-        if not name:
-            print("跳过打开：name 为空", file=sys.stderr)
-            continue
-        try:
-            desc_hint = None
-            open_role(idx, name, desc_hint)
-            opened.append(name)
-        except Exception as e:
-            print(json.dumps({"open_error": {"name": name, "error": str(e)}}, ensure_ascii=False), file=sys.stderr)
+            done = run_ops(idx, iter_manifest(args["manifest"], args["format"]), collect=False)
+        except OSError as e:
+            print(json.dumps({"error": f"读取清单失败: {e}"}, ensure_ascii=False), file=sys.stderr)
+            return 1
+    else:
+        done = run_ops(idx, _ops_from_lists())
 
     # 汇总输出
-    summary = {
-        "base": BASE,
-        "created": created,
-        "updated": updated,
-        "deleted": deleted,
-        "opened": opened,
-    }
+    summary = {"base": BASE, **done}
     print(json.dumps(summary, ensure_ascii=False, indent=2))
     return 0
 
@@ -4,6 +4,8 @@
 声明式同步脚本（模式 A）：
 - 以 JSON（默认 src/storage/roles.json）作为“期望状态”的唯一事实源
 - 同步规则：按 name 为主键，创建缺失项、对比差异再更新；不删除多余项（无 prune）
+- 远端索引只拉取 role_id/name/内容哈希（?fields=），按哈希判断差异；监听模式用 ?since= 变更流增量刷新
+- 待创建/更新的条目按批提交到 /webapi/roles/bulk；服务端没有该接口时自动回退为逐条请求
 - personality：按 name 稳定随机生成，避免多次运行产生抖动
 - open：可选参数，同步完成后按名称打开会话（若不存在将先创建再打开）
 
@@ -14,25 +16,45 @@
 - python scripts/roles_sync.py                      # 仅同步
 - python scripts/roles_sync.py --open 张三 李四     # 同步后打开多个角色
 - python scripts/roles_sync.py --file path/to.json  # 使用自定义 JSON 文件
+- python scripts/roles_sync.py --watch              # 首次全量同步后持续监听文件变化，仅推送有差异的条目
+- python scripts/roles_sync.py --watch --poll       # 强制使用轮询（非 Linux 或网络盘上 inotify 不可用时）
 """
 from __future__ import annotations
 
+import ctypes
+import ctypes.util
+import gzip
 import json
 import os
+import select
+import struct
 import sys
+import time
 import hashlib
 import random
 import urllib.request
 import urllib.error
+import urllib.parse
+import zlib
 import webbrowser
 from dataclasses import dataclass
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import brotli  # 可选：安装后可接收 br 压缩的响应
+except ImportError:
+    brotli = None
 
 # ======================= 基本配置 ======================= #
 BASE = os.environ.get("LOBECHAT_BASE", "http://localhost:3020").rstrip("/")
 DEFAULT_FILE = "src/storage/roles.json"
 TIMEOUT = 15
 OPEN_BROWSER_DEFAULT = True
+BULK_MAX_OPS = 200  # 单个批量请求的最大操作数（服务端上限 500）
+BULK_MAX_BYTES = 512 * 1024  # 单个批量请求的最大请求体字节数
+WATCH_DEBOUNCE = 0.2  # 秒；连续写入在此静默期内合并为一次同步
+WATCH_POLL_INTERVAL = 0.5  # 秒；轮询模式下检查文件状态的间隔
+ACCEPT_ENCODING = "br, gzip" if brotli is not None else "gzip"
 # ====================================================== #
 
 
@@ -43,12 +65,26 @@ class Role:
     name: str
     description: str | None = None
     personality: Any | None = None
+    hash: str | None = None  # description + personality 的内容哈希（与服务端 ?fields=hash 一致）
+
+
+def _decode_body(raw: bytes, encoding: str | None) -> bytes:
+    enc = (encoding or "").strip().lower()
+    if enc == "gzip":
+        return gzip.decompress(raw)
+    if enc == "deflate":
+        return zlib.decompress(raw)
+    if enc == "br" and brotli is not None:
+        return brotli.decompress(raw)
+    return raw
 
 
 def _request(method: str, path: str, data: Dict[str, Any] | None = None) -> Tuple[int, Any]:
     url = BASE + path
     req = urllib.request.Request(url=url, method=method)
     req.add_header("Accept", "application/json")
+    # 角色描述多为长中文文本，压缩后体积通常只有原来的 1/3
+    req.add_header("Accept-Encoding", ACCEPT_ENCODING)
     body = None
     if data is not None:
         req.add_header("Content-Type", "application/json")
@@ -56,7 +92,7 @@ def _request(method: str, path: str, data: Dict[str, Any] | None = None) -> Tupl
     try:
         with urllib.request.urlopen(req, data=body, timeout=TIMEOUT) as resp:
             status = resp.status
-            raw = resp.read()
+            raw = _decode_body(resp.read(), resp.headers.get("Content-Encoding"))
             text = raw.decode("utf-8", errors="replace")
             try:
                 payload = json.loads(text)
@@ -65,7 +101,7 @@ def _request(method: str, path: str, data: Dict[str, Any] | None = None) -> Tupl
             return status, payload
     except urllib.error.HTTPError as e:
         try:
-            err_text = e.read().decode("utf-8", errors="replace")
+            err_text = _decode_body(e.read(), e.headers.get("Content-Encoding")).decode("utf-8", errors="replace")
             err_json = json.loads(err_text)
         except Exception:
             err_json = {"error": str(e)}
@@ -74,21 +110,90 @@ def _request(method: str, path: str, data: Dict[str, Any] | None = None) -> Tupl
         return 0, {"error": f"连接失败: {e}"}
 
 
-def _fetch_all_roles() -> List[Role]:
-    st, payload = _request("GET", "/webapi/roles")
-    if st != 200 or not isinstance(payload, list):
-        print(json.dumps({"error": f"拉取现有角色失败(status={st})"}, ensure_ascii=False), file=sys.stderr)
-        return []
+ROLE_FIELDS = "role_id,name,hash"  # 远端索引只需要这些字段，不下载 description
+_remote_version: int | None = None  # 上次拉取时服务端的角色版本；None 表示服务端不支持变更流
+_remote_epoch: str | None = None  # 服务端版本历史标识；历史重建后旧版本号不再可比
+
+
+def _role_hash(description: str | None, personality: Any | None) -> str:
+    # 与 webapi/roles 的 canonicalJSON 一致：键排序、无空白、不转义非 ASCII
+    content = {"description": description or "", "personality": personality}
+    raw = json.dumps(content, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _role_from_payload(it: Dict[str, Any]) -> Role:
+    h = it.get("hash")
+    if h is None and "description" in it:
+        h = _role_hash(it.get("description"), it.get("personality"))
+    return Role(role_id=int(it.get("role_id")), name=str(it.get("name")), description=it.get("description"), personality=it.get("personality"), hash=h)
+
+
+def _parse_roles(items: Any) -> List[Role]:
     roles: List[Role] = []
-    for it in payload:
+    for it in items if isinstance(items, list) else []:
         try:
-            rid = int(it.get("role_id"))
-            roles.append(Role(role_id=rid, name=str(it.get("name")), description=it.get("description"), personality=it.get("personality")))
+            roles.append(_role_from_payload(it))
         except Exception:
             continue
     return roles
 
 
+def _remember_version(payload: Dict[str, Any]) -> None:
+    global _remote_version, _remote_epoch
+    version, epoch = payload.get("version"), payload.get("epoch")
+    if isinstance(version, int) and isinstance(epoch, str):
+        _remote_version, _remote_epoch = version, epoch
+    else:
+        # 没有 epoch 的服务端无法识别历史重建，不使用变更流
+        _remote_version, _remote_epoch = None, None
+
+
+def _fetch_all_roles() -> List[Role]:
+    global _remote_version, _remote_epoch
+    st, payload = _request("GET", f"/webapi/roles?since=0&fields={ROLE_FIELDS}")
+    if st == 200 and isinstance(payload, dict):
+        _remember_version(payload)
+        return _parse_roles(payload.get("roles"))
+    if st == 200 and isinstance(payload, list):
+        # 旧版服务端忽略查询参数，返回完整列表
+        _remote_version, _remote_epoch = None, None
+        return _parse_roles(payload)
+    print(json.dumps({"error": f"拉取现有角色失败(status={st})"}, ensure_ascii=False), file=sys.stderr)
+    return []
+
+
+def _refresh_index(idx: Dict[str, Role]) -> int:
+    """
+    通过 ?since=<version>&epoch=<epoch> 变更流把远端改动（其他人/其他脚本所做）合并进内存索引，返回变更条目数。
+    服务端不支持变更流时不做任何事；服务端要求重置时用响应中的全量列表（仍只含投影字段）重建索引。
+    """
+    if _remote_version is None:
+        return 0
+    query = urllib.parse.urlencode({"epoch": _remote_epoch, "fields": ROLE_FIELDS, "since": _remote_version})
+    st, payload = _request("GET", f"/webapi/roles?{query}")
+    if st != 200 or not isinstance(payload, dict):
+        raise RuntimeError(f"拉取变更失败(status={st})")
+    if not payload.get("reset"):
+        changed = _parse_roles(payload.get("roles"))
+        deleted = {int(x) for x in payload.get("deleted") or [] if str(x).isdigit()}
+        if deleted or changed:
+            by_id = {r.role_id: name for name, r in idx.items()}
+            for rid in deleted | {r.role_id for r in changed}:
+                if rid in by_id:
+                    idx.pop(by_id[rid], None)
+            for r in changed:
+                idx[r.name] = r
+        _remember_version(payload)
+        return len(changed) + len(deleted)
+    # 服务端版本历史被重建（如 roles.versions.json 丢失）或版本号未知：响应里已是全量列表
+    fresh = _index_by_name(_parse_roles(payload.get("roles")))
+    _remember_version(payload)
+    idx.clear()
+    idx.update(fresh)
+    return len(fresh)
+
+
 def _index_by_name(roles: List[Role]) -> Dict[str, Role]:
     idx: Dict[str, Role] = {}
     for r in roles:
@@ -98,6 +203,41 @@ def _index_by_name(roles: List[Role]) -> Dict[str, Role]:
     return idx
 
 
+# ------------------ 批量接口 ------------------ #
+_bulk_supported: bool | None = None  # None：尚未探测；False：服务端无 /webapi/roles/bulk
+
+
+def _bulk_request(ops: List[Dict[str, Any]]) -> List[Dict[str, Any]] | None:
+    """一次提交多个 create/update/delete；服务端不支持时返回 None，由调用方逐条回退。"""
+    global _bulk_supported
+    if _bulk_supported is False:
+        return None
+    st, res = _request("POST", "/webapi/roles/bulk", {"ops": ops})
+    if st in (404, 405):
+        _bulk_supported = False
+        return None
+    results = res.get("results") if isinstance(res, dict) else None
+    if st != 200 or not isinstance(results, list) or len(results) != len(ops):
+        raise RuntimeError(f"批量请求失败(status={st}): {res}")
+    _bulk_supported = True
+    return results
+
+
+def _bulk_batches(items: List[Tuple[str, Dict[str, Any]]]) -> Iterator[List[Tuple[str, Dict[str, Any]]]]:
+    # 同时按条数与请求体大小切分；description 往往有数 KB
+    batch: List[Tuple[str, Dict[str, Any]]] = []
+    size = 0
+    for item in items:
+        n = len(json.dumps(item[1], ensure_ascii=False).encode("utf-8"))
+        if batch and (len(batch) >= BULK_MAX_OPS or size + n > BULK_MAX_BYTES):
+            yield batch
+            batch, size = [], 0
+        batch.append(item)
+        size += n
+    if batch:
+        yield batch
+
+
 # ------------------ personality（按 name 稳定随机） ------------------ #
 STYLES = ["concise", "friendly", "formal", "humorous", "analytical"]
 TONES = ["neutral", "positive", "curious", "confident", "warm"]
@@ -128,7 +268,10 @@ def load_desired(file_path: str) -> List[Dict[str, str]]:
             data = json.load(f)
     except Exception as e:
         raise RuntimeError(f"读取 JSON 失败: {file_path} ({e})")
+    return _validate_desired(data)
 
+
+def _validate_desired(data: Any) -> List[Dict[str, str]]:
     if not isinstance(data, list):
         raise RuntimeError("JSON 顶层必须是数组")
 
@@ -157,12 +300,19 @@ def ensure_role(idx: Dict[str, Role], name: str, description: str | None) -> Rol
     st, res = _request("POST", "/webapi/roles", payload)
     if st not in (200, 201) or not isinstance(res, dict):
         raise RuntimeError(f"创建失败 {name}: {res}")
-    role = Role(role_id=int(res.get("role_id")), name=res.get("name"), description=res.get("description"), personality=res.get("personality"))
+    role = _role_from_payload(res)
     idx[name] = role
     print(f"已创建: {role.name} (role_id={role.role_id})")
     return role
 
 
+def _needs_update(role: Role, desired_desc: str, desired_persona: Dict[str, Any]) -> bool:
+    # 远端索引只含哈希时比较哈希；否则（旧版服务端）逐字段比较
+    if role.hash is not None and role.description is None:
+        return role.hash != _role_hash(desired_desc, desired_persona)
+    return (role.description or "") != desired_desc or (role.personality or {}) != desired_persona
+
+
 def upsert_role(idx: Dict[str, Role], name: str, description: str | None) -> Role:
     # 不存在则创建；存在则仅在有差异时更新
     if name not in idx:
@@ -172,8 +322,7 @@ def upsert_role(idx: Dict[str, Role], name: str, description: str | None) -> Rol
     desired_desc = description or ""
     desired_persona = generate_personality(name)
 
-    need_update = (role.description or "") != desired_desc or (role.personality or {}) != desired_persona
-    if not need_update:
+    if not _needs_update(role, desired_desc, desired_persona):
         print(f"无需更新: {name}")
         return role
 
@@ -181,12 +330,75 @@ def upsert_role(idx: Dict[str, Role], name: str, description: str | None) -> Rol
     st, res = _request("PUT", f"/webapi/roles/{role.role_id}", patch)
     if st != 200 or not isinstance(res, dict):
         raise RuntimeError(f"更新失败 {name}: {res}")
-    new_role = Role(role_id=int(res.get("role_id")), name=res.get("name"), description=res.get("description"), personality=res.get("personality"))
+    new_role = _role_from_payload(res)
     idx[name] = new_role
     print(f"已更新: {new_role.name} (role_id={new_role.role_id})")
     return new_role
 
 
+def _plan_op(idx: Dict[str, Role], name: str, description: str | None) -> Dict[str, Any] | None:
+    # 与 upsert_role 的判断一致：缺失则创建，有差异才更新，否则返回 None
+    desired_desc = description or ""
+    desired_persona = generate_personality(name)
+    role = idx.get(name)
+    if role is None:
+        return {"op": "create", "name": name, "description": desired_desc, "personality": desired_persona}
+    if not _needs_update(role, desired_desc, desired_persona):
+        return None
+    return {"op": "update", "role_id": role.role_id, "description": desired_desc, "personality": desired_persona}
+
+
+def sync_items(idx: Dict[str, Role], items: List[Dict[str, str]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    把期望状态中有差异的条目按批提交到批量接口（一次读改写 roles.json）；
+    服务端没有批量接口时逐条调用 upsert_role。返回 (created, updated, failed)。
+    """
+    created: List[Dict[str, Any]] = []
+    updated: List[Dict[str, Any]] = []
+    failed: List[Dict[str, Any]] = []
+
+    pending: List[Tuple[str, Dict[str, Any]]] = []
+    for item in items:
+        op = _plan_op(idx, item["name"], item.get("description"))
+        if op is None:
+            print(f"无需更新: {item['name']}")
+            continue
+        pending.append((item["name"], op))
+
+    for batch in _bulk_batches(pending):
+        try:
+            results = _bulk_request([op for _, op in batch])
+        except Exception as e:
+            failed.extend({"name": name, "error": str(e)} for name, _ in batch)
+            continue
+
+        if results is None:
+            for name, op in batch:
+                try:
+                    r = upsert_role(idx, name, op["description"])
+                except Exception as e:
+                    failed.append({"name": name, "error": str(e)})
+                    continue
+                (created if op["op"] == "create" else updated).append({"name": r.name, "role_id": r.role_id})
+            continue
+
+        for (name, op), res in zip(batch, results):
+            data = res.get("role") if isinstance(res, dict) else None
+            if not isinstance(data, dict) or res.get("status") not in (200, 201):
+                failed.append({"name": name, "error": res.get("message") if isinstance(res, dict) else res})
+                continue
+            role = _role_from_payload(data)
+            idx[name] = role
+            if op["op"] == "create":
+                print(f"已创建: {role.name} (role_id={role.role_id})")
+                created.append({"name": role.name, "role_id": role.role_id})
+            else:
+                print(f"已更新: {role.name} (role_id={role.role_id})")
+                updated.append({"name": role.name, "role_id": role.role_id})
+
+    return created, updated, failed
+
+
 def open_role(idx: Dict[str, Role], name: str, desc_hint: str | None, open_browser: bool = True) -> None:
     # 不存在则先创建再打开
     role = ensure_role(idx, name, desc_hint or "由 roles_sync 自动创建")
@@ -200,6 +412,171 @@ def open_role(idx: Dict[str, Role], name: str, desc_hint: str | None, open_brows
         webbrowser.open(full)
 
 
+# ------------------ 监听模式（--watch） ------------------ #
+# inotify 事件：写完关闭 / 原子替换（rename 到目标名）/ 新建 / 修改
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class _InotifyWatcher:
+    """监听文件所在目录（编辑器常以“写临时文件再 rename”的方式保存），只关心目标文件名。"""
+
+    def __init__(self, file_path: str) -> None:
+        libc_name = ctypes.util.find_library("c")
+        if not sys.platform.startswith("linux") or not libc_name:
+            raise OSError("inotify 不可用")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        directory = os.path.dirname(os.path.abspath(file_path))
+        mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+        if libc.inotify_add_watch(self.fd, directory.encode("utf-8"), mask) < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, f"inotify_add_watch 失败: {directory}")
+        self.name = os.path.basename(file_path).encode("utf-8")
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        """
+        阻塞至多 timeout 秒（None 为无限），目标文件有事件时返回 True，超时返回 False。
+        同目录其他文件（编辑器临时文件、服务端的 *.tmp 等）的事件不算，继续等到截止时间。
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            ready, _, _ = select.select([self.fd], [], [], remaining)
+            if not ready:
+                return False
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            offset = 0
+            hit = False
+            while offset + _INOTIFY_EVENT.size <= len(buf):
+                _wd, _mask, _cookie, length = _INOTIFY_EVENT.unpack_from(buf, offset)
+                offset += _INOTIFY_EVENT.size
+                name = buf[offset : offset + length].rstrip(b"\0")
+                offset += length
+                if name == self.name:
+                    hit = True
+            if hit:
+                return True
+
+
+class _PollingWatcher:
+    """轮询回退：比较 mtime/size/inode，任一变化即视为文件被改动。"""
+
+    def __init__(self, file_path: str) -> None:
+        self.file_path = file_path
+        self.last = self._stat()
+
+    def _stat(self) -> Tuple[int, int, int] | None:
+        try:
+            st = os.stat(self.file_path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            cur = self._stat()
+            if cur != self.last:
+                self.last = cur
+                return True
+            if deadline is None:
+                time.sleep(WATCH_POLL_INTERVAL)
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(WATCH_POLL_INTERVAL, remaining))
+
+
+def _make_watcher(file_path: str, force_poll: bool) -> _InotifyWatcher | _PollingWatcher:
+    if not force_poll:
+        try:
+            return _InotifyWatcher(file_path)
+        except (OSError, AttributeError) as e:
+            print(f"inotify 不可用，改用轮询: {e}", file=sys.stderr)
+    return _PollingWatcher(file_path)
+
+
+def _read_bytes(file_path: str) -> bytes | None:
+    try:
+        with open(file_path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def watch_loop(file_path: str, idx: Dict[str, Role], applied: Dict[str, str], force_poll: bool = False) -> None:
+    """
+    持续监听期望状态文件：
+    - 去抖：事件到来后等待 WATCH_DEBOUNCE 秒无新事件再处理，合并编辑器的连续写入
+    - 内容哈希未变化时不解析（如仅 touch 或保存了相同内容）
+    - 仅推送与上次已应用状态（applied: name -> description）不同的条目；远端索引 idx 常驻内存
+    """
+    watcher = _make_watcher(file_path, force_poll)
+    mode = "inotify" if isinstance(watcher, _InotifyWatcher) else "poll"
+    raw = _read_bytes(file_path)
+    last_digest = hashlib.sha256(raw).hexdigest() if raw is not None else None
+    print(json.dumps({"watch": {"file": file_path, "mode": mode}}, ensure_ascii=False))
+
+    while True:
+        if not watcher.wait(None):
+            continue
+        while watcher.wait(WATCH_DEBOUNCE):
+            pass
+
+        started = time.perf_counter()
+        raw = _read_bytes(file_path)
+        if raw is None:
+            continue
+        digest = hashlib.sha256(raw).hexdigest()
+        if digest == last_digest:
+            continue
+        try:
+            desired = _validate_desired(json.loads(raw.decode("utf-8")))
+        except Exception as e:
+            # 可能是保存到一半或手误，保留上次状态，等下一次变化
+            print(json.dumps({"watch_error": str(e)}, ensure_ascii=False), file=sys.stderr)
+            continue
+
+        changed = [it for it in desired if applied.get(it["name"]) != (it.get("description") or "")]
+        try:
+            # 先合并远端的增量变更，避免对已被他人删除/改名的角色使用过期的 role_id
+            _refresh_index(idx)
+        except Exception as e:
+            print(json.dumps({"watch_error": f"刷新远端索引失败: {e}"}, ensure_ascii=False), file=sys.stderr)
+        created, updated, failed = sync_items(idx, changed)
+        failed_names = {f["name"] for f in failed}
+        for it in changed:
+            if it["name"] not in failed_names:
+                applied[it["name"]] = it.get("description") or ""
+        pushed = created + updated
+        if not failed:
+            last_digest = digest
+        print(
+            json.dumps(
+                {
+                    "synced": pushed,
+                    "failed": failed,
+                    "entries": len(desired),
+                    "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+                },
+                ensure_ascii=False,
+            )
+        )
+
+
 # ------------------ CLI ------------------ #
 
 def parse_argv(argv: List[str]) -> Dict[str, Any]:
@@ -207,6 +584,8 @@ def parse_argv(argv: List[str]) -> Dict[str, Any]:
     file_path = DEFAULT_FILE
     open_names: List[str] = []
     open_browser = OPEN_BROWSER_DEFAULT
+    watch = False
+    force_poll = False
 
     i = 0
     while i < len(argv):
@@ -223,9 +602,17 @@ def parse_argv(argv: List[str]) -> Dict[str, Any]:
             open_browser = False
             i += 1
             continue
+        if a == "--watch":
+            watch = True
+            i += 1
+            continue
+        if a == "--poll":
+            force_poll = True
+            i += 1
+            continue
         i += 1
 
-    return {"file": file_path, "open": open_names, "open_browser": open_browser}
+    return {"file": file_path, "open": open_names, "open_browser": open_browser, "watch": watch, "poll": force_poll}
 
 
 def main() -> int:
@@ -238,18 +625,7 @@ def main() -> int:
         print(json.dumps({"error": str(e)}, ensure_ascii=False), file=sys.stderr)
         return 1
 
-    created, updated = [], []
-
-    for item in desired:
-        name = item["name"]
-        desc = item.get("description")
-        # upsert
-        before = idx.get(name)
-        r = upsert_role(idx, name, desc)
-        if before is None:
-            created.append({"name": r.name, "role_id": r.role_id})
-        elif (before.description or "") != (r.description or "") or (before.personality or {}) != (r.personality or {}):
-            updated.append({"name": r.name, "role_id": r.role_id})
+    created, updated, failed = sync_items(idx, desired)
 
     # open
     for name in args["open"]:
@@ -263,10 +639,22 @@ def main() -> int:
         "file": args["file"],
         "created": created,
         "updated": updated,
+        "failed": failed,
         "opened": args["open"],
     }
     print(json.dumps(summary, ensure_ascii=False, indent=2))
-    return 0
+
+    if args["watch"]:
+        # 以首次同步后的结果作为“已应用状态”，之后只推送增量
+        failed_names = {f["name"] for f in failed}
+        applied = {it["name"]: it.get("description") or "" for it in desired if it["name"] not in failed_names}
+        try:
+            watch_loop(args["file"], idx, applied, force_poll=args["poll"])
+        except KeyboardInterrupt:
+            print("\n已停止监听")
+        return 0
+    # 有条目同步失败时以非零退出，CI 与包装脚本才能察觉
+    return 1 if failed else 0
 
 
 if __name__ == "__main__":
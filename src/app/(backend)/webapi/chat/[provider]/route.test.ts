@@ -3,6 +3,7 @@ import { getAuth } from '@clerk/nextjs/server';
 import { LobeRuntimeAI, ModelRuntime } from '@lobechat/model-runtime';
 import { ChatErrorType } from '@lobechat/types';
 import { getXorPayload } from '@lobechat/utils/server';
+import { gzipSync } from 'node:zlib';
 import { afterEach, beforeEach, describe, expect, it, vi } from 'vitest';
 
 import { checkAuthMethod } from '@/app/(backend)/middleware/auth/utils';
@@ -189,6 +190,97 @@ describe('POST handler', () => {
       });
     });
 
+    it('should decode a gzip-compressed payload', async () => {
+      vi.mocked(getXorPayload).mockReturnValueOnce({
+        accessCode: 'test-access-code',
+        apiKey: 'test-api-key',
+        azureApiVersion: 'v1',
+        userId: 'abc',
+      });
+
+      const mockParams = Promise.resolve({ provider: 'test-provider' });
+      const mockChatPayload = { message: '你好，世界'.repeat(200) };
+      request = new Request(new URL('https://test.com'), {
+        headers: {
+          [LOBE_CHAT_AUTH_HEADER]: 'Bearer some-valid-token',
+          'Content-Encoding': 'gzip',
+        },
+        method: 'POST',
+        body: gzipSync(JSON.stringify(mockChatPayload)),
+      });
+
+      const mockChatResponse: any = { success: true, message: 'Reply from agent' };
+
+      vi.spyOn(ModelRuntime.prototype, 'chat').mockResolvedValue(mockChatResponse);
+
+      const response = await POST(request as unknown as Request, { params: mockParams });
+
+      expect(response).toEqual(mockChatResponse);
+      expect(ModelRuntime.prototype.chat).toHaveBeenCalledWith(mockChatPayload, {
+        user: 'abc',
+        signal: expect.anything(),
+      });
+    });
+
+    it('should reject an unsupported Content-Encoding', async () => {
+      vi.mocked(getXorPayload).mockReturnValueOnce({
+        accessCode: 'test-access-code',
+        apiKey: 'test-api-key',
+        azureApiVersion: 'v1',
+        userId: 'abc',
+      });
+
+      const mockParams = Promise.resolve({ provider: 'test-provider' });
+      request = new Request(new URL('https://test.com'), {
+        headers: {
+          [LOBE_CHAT_AUTH_HEADER]: 'Bearer some-valid-token',
+          'Content-Encoding': 'zstd',
+        },
+        method: 'POST',
+        body: 'not-really-zstd',
+      });
+
+      vi.spyOn(ModelRuntime.prototype, 'chat');
+
+      const response = await POST(request as unknown as Request, { params: mockParams });
+
+      expect(response.status).toBe(415);
+      expect(await response.json()).toEqual({
+        body: { message: 'Unsupported Content-Encoding: zstd', provider: 'test-provider' },
+        errorType: ChatErrorType.UnsupportedMediaType,
+      });
+      expect(ModelRuntime.prototype.chat).not.toHaveBeenCalled();
+    });
+
+    it('should reject a payload that decompresses past the size limit', async () => {
+      vi.mocked(getXorPayload).mockReturnValueOnce({
+        accessCode: 'test-access-code',
+        apiKey: 'test-api-key',
+        azureApiVersion: 'v1',
+        userId: 'abc',
+      });
+
+      const mockParams = Promise.resolve({ provider: 'test-provider' });
+      // ~33 MB of JSON that gzips to a few dozen KB
+      const bomb = gzipSync(`{"message":"${' '.repeat(33 * 1024 * 1024)}"}`);
+      request = new Request(new URL('https://test.com'), {
+        headers: {
+          [LOBE_CHAT_AUTH_HEADER]: 'Bearer some-valid-token',
+          'Content-Encoding': 'gzip',
+        },
+        method: 'POST',
+        body: bomb,
+      });
+
+      vi.spyOn(ModelRuntime.prototype, 'chat');
+
+      const response = await POST(request as unknown as Request, { params: mockParams });
+
+      expect(response.status).toBe(413);
+      expect((await response.json()).errorType).toBe(ChatErrorType.PayloadTooLarge);
+      expect(ModelRuntime.prototype.chat).not.toHaveBeenCalled();
+    });
+
     it('should return an error response when chat completion fails', async () => {
       // 设置 getJWTPayload 和 initAgentRuntimeWithUserPayload 的模拟返回值
       vi.mocked(getXorPayload).mockReturnValueOnce({
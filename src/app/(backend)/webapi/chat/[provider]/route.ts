@@ -13,6 +13,33 @@ import { getTracePayload } from '@/utils/trace';
 
 export const maxDuration = 300;
 
+// clients on slow uplinks may gzip large chat payloads; DecompressionStream works on both node and edge
+const SUPPORTED_ENCODINGS = new Set(['deflate', 'gzip']);
+// a few KB of gzip can expand to gigabytes, so stop reading once the decoded body passes this
+const MAX_DECOMPRESSED_BYTES = 32 * 1024 * 1024;
+
+// resolves to null when the decompressed body exceeds MAX_DECOMPRESSED_BYTES
+const readPayload = async (req: Request, encoding: string) => {
+  if (!SUPPORTED_ENCODINGS.has(encoding) || !req.body) return req.json();
+
+  const reader = req.body
+    .pipeThrough(new DecompressionStream(encoding as CompressionFormat))
+    .getReader();
+  const chunks: Uint8Array[] = [];
+  let total = 0;
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    total += value.byteLength;
+    if (total > MAX_DECOMPRESSED_BYTES) {
+      await reader.cancel();
+      return null;
+    }
+    chunks.push(value);
+  }
+  return JSON.parse(await new Blob(chunks).text());
+};
+
 export const POST = checkAuth(async (req: Request, { params, jwtPayload, createRuntime }) => {
   const { provider } = await params;
 
@@ -27,7 +54,21 @@ export const POST = checkAuth(async (req: Request, { params, jwtPayload, createR
 
     // ============  2. create chat completion   ============ //
 
-    const data = (await req.json()) as ChatStreamPayload;
+    const encoding = (req.headers.get('content-encoding') || 'identity').trim().toLowerCase();
+    if (encoding !== 'identity' && !SUPPORTED_ENCODINGS.has(encoding)) {
+      return createErrorResponse(ChatErrorType.UnsupportedMediaType, {
+        message: `Unsupported Content-Encoding: ${encoding}`,
+        provider,
+      });
+    }
+
+    const data = (await readPayload(req, encoding)) as ChatStreamPayload | null;
+    if (data === null) {
+      return createErrorResponse(ChatErrorType.PayloadTooLarge, {
+        message: `Decompressed payload exceeds ${MAX_DECOMPRESSED_BYTES} bytes`,
+        provider,
+      });
+    }
 
     const tracePayload = getTracePayload(req);
 
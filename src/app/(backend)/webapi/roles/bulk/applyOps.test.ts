@@ -0,0 +1,86 @@
+import { describe, expect, it } from 'vitest';
+
+import { applyOps } from './applyOps';
+
+const roles = () => [
+  { description: 'a', name: '张三', personality: null, role_id: 1 },
+  { description: 'b', name: '李四', personality: null, role_id: 2 },
+];
+
+describe('applyOps', () => {
+  it('should assign increasing role ids to created roles', () => {
+    const { changed, next, results } = applyOps(roles(), [
+      { description: 'c', name: '王五', op: 'create' },
+      { name: '赵六', op: 'create' },
+    ]);
+
+    expect(changed).toBe(true);
+    expect(results.map((r) => r.status)).toEqual([201, 201]);
+    expect(next.map((r) => r.role_id)).toEqual([1, 2, 3, 4]);
+    expect(next[3]).toEqual({ description: '', name: '赵六', personality: null, role_id: 4 });
+  });
+
+  it('should return 409 when creating a duplicate name', () => {
+    const { changed, next, results } = applyOps(roles(), [
+      { name: '张三', op: 'create' },
+      { name: '王五', op: 'create' },
+      { name: '王五', op: 'create' },
+    ]);
+
+    expect(results.map((r) => r.status)).toEqual([409, 201, 409]);
+    expect(changed).toBe(true);
+    expect(next.filter((r) => r.name === '王五')).toHaveLength(1);
+  });
+
+  it('should allow deleting and re-creating the same name in one batch', () => {
+    const { next, results } = applyOps(roles(), [
+      { op: 'delete', role_id: 1 },
+      { description: 'new', name: '张三', op: 'create' },
+    ]);
+
+    expect(results.map((r) => r.status)).toEqual([200, 201]);
+    expect(next).toHaveLength(2);
+    expect(next.find((r) => r.name === '张三')).toMatchObject({ description: 'new', role_id: 3 });
+  });
+
+  it('should return 404 when updating a role removed earlier in the batch', () => {
+    const { next, results } = applyOps(roles(), [
+      { op: 'delete', role_id: 2 },
+      { description: 'x', op: 'update', role_id: 2 },
+      { description: 'x', op: 'update', role_id: 99 },
+    ]);
+
+    expect(results.map((r) => r.status)).toEqual([200, 404, 404]);
+    expect(next.map((r) => r.role_id)).toEqual([1]);
+  });
+
+  it('should reject renaming onto an existing name', () => {
+    const { results } = applyOps(roles(), [{ name: '李四', op: 'update', role_id: 1 }]);
+
+    expect(results[0].status).toBe(409);
+  });
+
+  it('should report no change when every op failed', () => {
+    const input = roles();
+    const { changed, next, results } = applyOps(input, [
+      { name: '张三', op: 'create' },
+      { op: 'update', role_id: 42 },
+      { op: 'delete', role_id: 42 },
+      { op: 'rename' } as any,
+    ]);
+
+    expect(results.map((r) => r.status)).toEqual([409, 404, 200, 400]);
+    expect(changed).toBe(false);
+    expect(next).toEqual(input);
+  });
+
+  it('should not mutate the input list', () => {
+    const input = roles();
+    applyOps(input, [
+      { name: '王五', op: 'create' },
+      { op: 'delete', role_id: 1 },
+    ]);
+
+    expect(input).toEqual(roles());
+  });
+});
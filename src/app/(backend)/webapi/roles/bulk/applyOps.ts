@@ -0,0 +1,84 @@
+export type BulkOp =
+  | { description?: string; name: string; op: 'create'; personality?: any }
+  | { op: 'update'; role_id: number | string; [key: string]: any }
+  | { op: 'delete'; role_id: number | string };
+
+export type BulkResult = { message?: string; role?: any; status: number; success?: boolean };
+
+// Apply ops in order against an in-memory copy of roles.json; `changed` is false when nothing needs writing
+export const applyOps = (
+  roles: any[],
+  ops: BulkOp[],
+): { changed: boolean; next: any[]; results: BulkResult[] } => {
+  const list = [...roles];
+  let maxId = list.reduce((m, r) => {
+    const idNum = Number(r.role_id);
+    return Number.isFinite(idNum) ? Math.max(m, idNum) : m;
+  }, 0);
+  const byId = new Map<string, number>(list.map((r, i) => [String(r.role_id), i]));
+  const names = new Set<string>(list.map((r) => String(r.name)));
+  const removed = new Set<number>();
+  let changed = false;
+
+  const results = ops.map((item): BulkResult => {
+    switch (item?.op) {
+      case 'create': {
+        const { name, description, personality } = item;
+        if (!name) return { message: 'name is required', status: 400 };
+        if (names.has(String(name))) {
+          return { message: `name already exists: ${name}`, status: 409 };
+        }
+
+        maxId += 1;
+        const role = {
+          description: description ?? '',
+          name,
+          personality: personality ?? null,
+          role_id: maxId,
+        };
+        byId.set(String(role.role_id), list.length);
+        names.add(String(name));
+        list.push(role);
+        changed = true;
+        return { role, status: 201 };
+      }
+
+      case 'update': {
+        const { op, role_id, ...patch } = item;
+        void op;
+        const idx = byId.get(String(role_id));
+        if (idx === undefined || removed.has(idx)) return { message: 'Not found', status: 404 };
+
+        const prev = list[idx];
+        const next = { ...prev, ...patch, role_id: prev.role_id };
+        if (next.name !== prev.name) {
+          if (names.has(String(next.name))) {
+            return { message: `name already exists: ${next.name}`, status: 409 };
+          }
+          names.delete(String(prev.name));
+          names.add(String(next.name));
+        }
+        list[idx] = next;
+        changed = true;
+        return { role: next, status: 200 };
+      }
+
+      case 'delete': {
+        // same as DELETE /webapi/roles/[id]: deleting a missing role is not an error
+        const idx = byId.get(String(item.role_id));
+        if (idx !== undefined && !removed.has(idx)) {
+          removed.add(idx);
+          names.delete(String(list[idx].name));
+          changed = true;
+        }
+        return { status: 200, success: true };
+      }
+
+      default: {
+        return { message: `unknown op: ${(item as any)?.op}`, status: 400 };
+      }
+    }
+  });
+
+  return { changed, next: list.filter((_, i) => !removed.has(i)), results };
+};
@@ -0,0 +1,94 @@
+// @vitest-environment node
+import { promises as fs } from 'node:fs';
+import { beforeEach, describe, expect, it, vi } from 'vitest';
+
+import { POST } from './route';
+
+vi.mock('node:fs', async (importOriginal) => {
+  const actual = (await importOriginal()) as any;
+  return {
+    ...actual,
+    promises: { ...actual.promises, readFile: vi.fn(), rename: vi.fn(), writeFile: vi.fn() },
+  };
+});
+
+const bulkRequest = (ops: any[]) =>
+  new Request('https://test.com/webapi/roles/bulk', {
+    body: JSON.stringify({ ops }),
+    method: 'POST',
+  }) as any;
+
+const stored = [{ description: 'a', name: '张三', personality: null, role_id: 1 }];
+
+beforeEach(() => {
+  vi.resetAllMocks();
+  vi.mocked(fs.readFile).mockResolvedValue(JSON.stringify(stored) as any);
+});
+
+describe('POST /webapi/roles/bulk', () => {
+  it('should write roles.json atomically when an op succeeds', async () => {
+    const res = await POST(bulkRequest([{ name: '李四', op: 'create' }]));
+
+    expect(res.status).toBe(200);
+    expect((await res.json()).results[0].status).toBe(201);
+    expect(fs.writeFile).toHaveBeenCalledTimes(1);
+    const [tmp, content] = vi.mocked(fs.writeFile).mock.calls[0];
+    expect(String(tmp)).toMatch(/roles\.json\.\d+\.tmp$/);
+    expect(JSON.parse(String(content)).map((r: any) => r.name)).toEqual(['张三', '李四']);
+    expect(fs.rename).toHaveBeenCalledWith(tmp, expect.stringMatching(/roles\.json$/));
+  });
+
+  it('should not write when every op failed', async () => {
+    const res = await POST(
+      bulkRequest([
+        { name: '张三', op: 'create' },
+        { op: 'update', role_id: 9 },
+      ]),
+    );
+
+    expect(res.status).toBe(200);
+    expect((await res.json()).results.map((r: any) => r.status)).toEqual([409, 404]);
+    expect(fs.writeFile).not.toHaveBeenCalled();
+  });
+
+  it('should treat a missing roles.json as an empty list', async () => {
+    vi.mocked(fs.readFile).mockRejectedValue(Object.assign(new Error('missing'), { code: 'ENOENT' }));
+
+    const res = await POST(bulkRequest([{ name: '李四', op: 'create' }]));
+
+    expect(res.status).toBe(200);
+    const [, content] = vi.mocked(fs.writeFile).mock.calls[0];
+    expect(JSON.parse(String(content))).toEqual([
+      { description: '', name: '李四', personality: null, role_id: 1 },
+    ]);
+  });
+
+  it('should return 500 without writing when roles.json cannot be parsed', async () => {
+    // e.g. read while a per-item route is rewriting the file
+    vi.mocked(fs.readFile).mockResolvedValue('[{"role_id": 1, "na' as any);
+
+    const res = await POST(bulkRequest([{ name: '李四', op: 'create' }]));
+
+    expect(res.status).toBe(500);
+    expect(fs.writeFile).not.toHaveBeenCalled();
+    expect(fs.rename).not.toHaveBeenCalled();
+  });
+
+  it('should return 500 without writing on other read errors', async () => {
+    vi.mocked(fs.readFile).mockRejectedValue(Object.assign(new Error('denied'), { code: 'EACCES' }));
+
+    const res = await POST(bulkRequest([{ name: '李四', op: 'create' }]));
+
+    expect(res.status).toBe(500);
+    expect(fs.writeFile).not.toHaveBeenCalled();
+  });
+
+  it('should reject more than 500 ops', async () => {
+    const ops = Array.from({ length: 501 }, (_, i) => ({ name: `r${i}`, op: 'create' }));
+
+    const res = await POST(bulkRequest(ops));
+
+    expect(res.status).toBe(413);
+    expect(fs.readFile).not.toHaveBeenCalled();
+  });
+});
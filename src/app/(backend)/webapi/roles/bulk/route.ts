@@ -0,0 +1,69 @@
+import { promises as fs } from 'node:fs';
+import { NextRequest } from 'next/server';
+import path from 'node:path';
+
+import { applyOps } from './applyOps';
+
+export const runtime = 'nodejs';
+
+const ROLES_PATH = path.join(process.cwd(), 'src', 'storage', 'roles.json');
+
+// keep a single request well below typical body limits
+const MAX_OPS = 500;
+
+// a missing file is an empty list; any other read/parse failure must not be mistaken for one,
+// or the write below would replace every role with just this batch
+const loadRoles = async (): Promise<any[]> => {
+  let content: string;
+  try {
+    content = await fs.readFile(ROLES_PATH, 'utf8');
+  } catch (e: any) {
+    if (e?.code === 'ENOENT') return [];
+    throw e;
+  }
+  const list = JSON.parse(content);
+  if (!Array.isArray(list)) throw new Error('roles.json is not an array');
+  return list;
+};
+
+// write to a temp file then rename, so concurrent readers never see a half-written file
+const saveRoles = async (list: any[]) => {
+  const tmp = `${ROLES_PATH}.${process.pid}.tmp`;
+  await fs.writeFile(tmp, JSON.stringify(list, null, 2), 'utf8');
+  await fs.rename(tmp, ROLES_PATH);
+};
+
+// serialize bulk read-modify-write cycles within this process
+let queue: Promise<unknown> = Promise.resolve();
+const withLock = <T>(fn: () => Promise<T>): Promise<T> => {
+  const run = queue.then(fn, fn);
+  queue = run.catch(() => undefined);
+  return run;
+};
+
+// Apply a list of create/update/delete operations in one read-modify-write of roles.json
+export async function POST(req: NextRequest) {
+  try {
+    const body = await req.json();
+    const ops = body?.ops;
+    if (!Array.isArray(ops)) {
+      return Response.json({ message: 'ops must be an array' }, { status: 400 });
+    }
+    if (ops.length > MAX_OPS) {
+      return Response.json({ message: `at most ${MAX_OPS} ops per request` }, { status: 413 });
+    }
+
+    const results = await withLock(async () => {
+      const applied = applyOps(await loadRoles(), ops);
+      if (applied.changed) await saveRoles(applied.next);
+      return applied.results;
+    });
+
+    return Response.json({ results }, { status: 200 });
+  } catch (e: any) {
+    return Response.json(
+      { error: e?.message, message: 'Failed to apply bulk ops' },
+      { status: 500 },
+    );
+  }
+}
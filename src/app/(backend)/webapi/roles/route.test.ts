@@ -0,0 +1,235 @@
+// @vitest-environment node
+import { promises as fs } from 'node:fs';
+import { brotliDecompressSync, gunzipSync } from 'node:zlib';
+import { beforeEach, describe, expect, it, vi } from 'vitest';
+
+vi.mock('node:fs', async (importOriginal) => {
+  const actual = (await importOriginal()) as any;
+  return {
+    ...actual,
+    promises: { ...actual.promises, readFile: vi.fn(), stat: vi.fn(), writeFile: vi.fn() },
+  };
+});
+
+const missing = () => Object.assign(new Error('missing'), { code: 'ENOENT' });
+
+let roles: any[];
+let mtimeMs: number;
+let sidecar: string | null;
+let routePromise: Promise<typeof import('./route')>;
+
+// the route caches its snapshot at module level, so every test loads a fresh copy
+const loadRoute = async () => {
+  vi.resetModules();
+  return import('./route');
+};
+
+const setRoles = (list: any[]) => {
+  roles = list;
+  mtimeMs += 1;
+};
+
+const get = async (query = '', headers?: Record<string, string>) => {
+  const { GET } = await routePromise;
+  return GET(new Request(`https://test.com/webapi/roles${query}`, { headers }) as any);
+};
+
+// enough roles for the JSON body to pass the 1 KB compression threshold
+const largeRoles = () =>
+  Array.from({ length: 20 }, (_, i) => ({
+    description: `角色${i}的描述，`.repeat(10),
+    name: `角色${i}`,
+    personality: null,
+    role_id: i + 1,
+  }));
+
+beforeEach(() => {
+  vi.resetAllMocks();
+  roles = [
+    { description: 'a', name: '张三', personality: null, role_id: 1 },
+    { description: 'b', name: '李四', personality: { tone: 'calm' }, role_id: 2 },
+  ];
+  mtimeMs = 1;
+  sidecar = null;
+  vi.mocked(fs.stat).mockImplementation(async () => ({ mtimeMs, size: 100 }) as any);
+  vi.mocked(fs.readFile).mockImplementation(async (file: any) => {
+    if (String(file).endsWith('roles.json')) return JSON.stringify(roles) as any;
+    if (sidecar === null) throw missing();
+    return sidecar as any;
+  });
+  vi.mocked(fs.writeFile).mockImplementation(async (_file: any, content: any) => {
+    sidecar = String(content);
+  });
+  routePromise = loadRoute();
+});
+
+describe('GET /webapi/roles', () => {
+  it('should return the full list without query parameters', async () => {
+    const res = await get();
+
+    expect(res.status).toBe(200);
+    expect(await res.json()).toEqual(roles);
+    expect(res.headers.get('X-Roles-Version')).toBe('1');
+    expect(res.headers.get('X-Roles-Epoch')).toBeTruthy();
+  });
+
+  it('should project the requested fields', async () => {
+    const body = await (await get('?fields=role_id,name,hash')).json();
+
+    expect(body.map((r: any) => Object.keys(r).sort())).toEqual([
+      ['hash', 'name', 'role_id'],
+      ['hash', 'name', 'role_id'],
+    ]);
+    expect(body[0].hash).toMatch(/^[\da-f]{16}$/);
+    expect(body[0].hash).not.toBe(body[1].hash);
+  });
+
+  it('should return every role for since=0 and none for the current version', async () => {
+    const all = await (await get('?since=0&fields=role_id')).json();
+    expect(all).toMatchObject({ deleted: [], roles: [{ role_id: 1 }, { role_id: 2 }], version: 1 });
+    expect(all.reset).toBeUndefined();
+
+    const none = await (await get(`?since=1&epoch=${all.epoch}`)).json();
+    expect(none).toMatchObject({ deleted: [], epoch: all.epoch, roles: [], version: 1 });
+  });
+
+  it('should report changed and deleted roles after roles.json changes', async () => {
+    const { epoch } = await (await get('?since=0')).json();
+
+    setRoles([
+      { description: 'a2', name: '张三', personality: null, role_id: 1 },
+      { description: 'c', name: '王五', personality: null, role_id: 3 },
+    ]);
+    const body = await (await get(`?since=1&epoch=${epoch}&fields=role_id,name`)).json();
+
+    expect(body).toEqual({
+      deleted: [2],
+      epoch,
+      roles: [
+        { name: '张三', role_id: 1 },
+        { name: '王五', role_id: 3 },
+      ],
+      version: 2,
+    });
+  });
+
+  it('should not bump the version when roles.json is rewritten unchanged', async () => {
+    const { epoch } = await (await get('?since=0')).json();
+
+    setRoles(JSON.parse(JSON.stringify(roles)));
+    const body = await (await get(`?since=1&epoch=${epoch}`)).json();
+
+    expect(body).toMatchObject({ deleted: [], roles: [], version: 1 });
+  });
+
+  it('should ask for a reset when the version is unknown', async () => {
+    const { epoch } = await (await get('?since=0')).json();
+
+    const body = await (await get(`?since=7&epoch=${epoch}&fields=role_id`)).json();
+
+    expect(body).toMatchObject({ reset: true, roles: [{ role_id: 1 }, { role_id: 2 }], version: 1 });
+  });
+
+  it('should ask for a reset when the version belongs to another history', async () => {
+    await get('?since=0');
+
+    const foreign = await (await get('?since=1&epoch=other')).json();
+    const noEpoch = await (await get('?since=1')).json();
+
+    expect(foreign).toMatchObject({ reset: true, version: 1 });
+    expect(foreign.roles).toHaveLength(2);
+    expect(noEpoch.reset).toBe(true);
+  });
+
+  it('should start a new epoch when the sidecar is lost', async () => {
+    const first = await (await get('?since=0')).json();
+
+    sidecar = null;
+    routePromise = loadRoute();
+    const body = await (await get(`?since=${first.version}&epoch=${first.epoch}`)).json();
+
+    expect(body.reset).toBe(true);
+    expect(body.epoch).not.toBe(first.epoch);
+  });
+
+  it('should keep the epoch and versions across restarts', async () => {
+    const first = await (await get('?since=0')).json();
+
+    routePromise = loadRoute();
+    const body = await (await get(`?since=${first.version}&epoch=${first.epoch}`)).json();
+
+    expect(body).toMatchObject({ epoch: first.epoch, roles: [], version: 1 });
+    expect(body.reset).toBeUndefined();
+  });
+
+  it('should still serve the list when the sidecar cannot be written', async () => {
+    vi.mocked(fs.writeFile).mockRejectedValue(
+      Object.assign(new Error('read-only'), { code: 'EROFS' }),
+    );
+    const warn = vi.spyOn(console, 'warn').mockImplementation(() => {});
+
+    const res = await get('?since=0&fields=role_id');
+
+    expect(res.status).toBe(200);
+    expect((await res.json()).roles).toHaveLength(2);
+    expect(warn).toHaveBeenCalled();
+    warn.mockRestore();
+  });
+
+  describe('compression', () => {
+    beforeEach(() => {
+      setRoles(largeRoles());
+    });
+
+    it('should gzip large bodies when the client accepts gzip', async () => {
+      const res = await get('', { 'Accept-Encoding': 'gzip' });
+
+      expect(res.headers.get('Content-Encoding')).toBe('gzip');
+      expect(res.headers.get('Vary')).toBe('Accept-Encoding');
+      const body = gunzipSync(Buffer.from(await res.arrayBuffer()));
+      expect(JSON.parse(body.toString('utf8'))).toEqual(roles);
+    });
+
+    it('should prefer br when the client accepts it', async () => {
+      const res = await get('?since=0', { 'Accept-Encoding': 'gzip, deflate, br' });
+
+      expect(res.headers.get('Content-Encoding')).toBe('br');
+      expect(res.headers.get('Vary')).toBe('Accept-Encoding');
+      const body = brotliDecompressSync(Buffer.from(await res.arrayBuffer()));
+      expect(JSON.parse(body.toString('utf8'))).toMatchObject({ deleted: [], roles, version: 1 });
+    });
+
+    it('should not use an encoding refused with q=0', async () => {
+      const refused = await get('', { 'Accept-Encoding': 'gzip;q=0' });
+      const fallback = await get('', { 'Accept-Encoding': 'br;q=0, gzip;q=0.5' });
+
+      expect(refused.headers.get('Content-Encoding')).toBeNull();
+      expect(refused.headers.get('Vary')).toBe('Accept-Encoding');
+      expect(await refused.json()).toEqual(roles);
+      expect(fallback.headers.get('Content-Encoding')).toBe('gzip');
+    });
+
+    it('should send plain JSON for identity', async () => {
+      const res = await get('', { 'Accept-Encoding': 'identity' });
+
+      expect(res.headers.get('Content-Encoding')).toBeNull();
+      expect(await res.json()).toEqual(roles);
+    });
+
+    it('should not compress bodies under 1 KB', async () => {
+      setRoles([{ description: 'a', name: '张三', personality: null, role_id: 1 }]);
+
+      const res = await get('', { 'Accept-Encoding': 'br, gzip' });
+
+      expect(res.headers.get('Content-Encoding')).toBeNull();
+      expect(res.headers.get('Vary')).toBe('Accept-Encoding');
+      expect(await res.json()).toEqual(roles);
+    });
+  });
+
+  it('should reject an invalid since', async () => {
+    const res = await get('?since=-1');
+
+    expect(res.status).toBe(400);
+  });
+});
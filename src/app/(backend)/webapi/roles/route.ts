@@ -1,17 +1,223 @@
+import { createHash, randomUUID } from 'node:crypto';
 import { promises as fs } from 'node:fs';
 import { NextRequest } from 'next/server';
 import path from 'node:path';
+import { promisify } from 'node:util';
+import { brotliCompress, constants as zlibConstants, gzip } from 'node:zlib';
 
 export const runtime = 'nodejs';
 
 const ROLES_PATH = path.join(process.cwd(), 'src', 'storage', 'roles.json');
+const VERSIONS_PATH = path.join(process.cwd(), 'src', 'storage', 'roles.versions.json');
 
-export async function GET(_req: NextRequest) {
+// stable JSON (sorted keys, no whitespace) so the Python scripts can compute the same hash
+const canonicalJSON = (value: any): string => {
+  if (Array.isArray(value)) return `[${value.map(canonicalJSON).join(',')}]`;
+  if (value && typeof value === 'object') {
+    return `{${Object.keys(value)
+      .sort()
+      .map((k) => `${JSON.stringify(k)}:${canonicalJSON(value[k])}`)
+      .join(',')}}`;
+  }
+  return JSON.stringify(value ?? null);
+};
+
+// smaller bodies are not worth the CPU
+const COMPRESS_MIN_BYTES = 1024;
+const brotliAsync = promisify(brotliCompress);
+const gzipAsync = promisify(gzip);
+
+const pickEncoding = (acceptEncoding: string | null): 'br' | 'gzip' | null => {
+  const accepted = new Set(
+    (acceptEncoding || '')
+      .split(',')
+      .map((part) => part.trim().split(';'))
+      .filter(([, q]) => !q || Number(q.trim().replace(/^q=/, '')) > 0)
+      .map(([name]) => name.trim().toLowerCase()),
+  );
+  if (accepted.has('br')) return 'br';
+  if (accepted.has('gzip') || accepted.has('*')) return 'gzip';
+  return null;
+};
+
+// descriptions are long CJK strings that compress well; encode here so br works without a reverse proxy
+const jsonResponse = async (req: NextRequest, body: unknown, headers: Record<string, string>) => {
+  const json = JSON.stringify(body);
+  const encoding = pickEncoding(req.headers.get('accept-encoding'));
+  const baseHeaders = { ...headers, 'Content-Type': 'application/json', 'Vary': 'Accept-Encoding' };
+  if (!encoding || Buffer.byteLength(json) < COMPRESS_MIN_BYTES) {
+    return new Response(json, { headers: baseHeaders, status: 200 });
+  }
+
+  const data =
+    encoding === 'br'
+      ? await brotliAsync(json, {
+          params: {
+            [zlibConstants.BROTLI_PARAM_MODE]: zlibConstants.BROTLI_MODE_TEXT,
+            [zlibConstants.BROTLI_PARAM_QUALITY]: 5,
+          },
+        })
+      : await gzipAsync(json);
+  return new Response(data, {
+    headers: { ...baseHeaders, 'Content-Encoding': encoding },
+    status: 200,
+  });
+};
+
+type VersionState = {
+  // role_id -> { name + content hash, version at which that state was first seen }
+  entries: Record<string, { hash: string; name: string; version: number }>;
+  // identifies this version history; a new one starts whenever the sidecar is lost, so versions
+  // from an older history are never compared against this one
+  epoch: string;
+  // role_id -> version at which the role disappeared
+  tombstones: Record<string, number>;
+  version: number;
+};
+
+const hashRole = (role: any) => {
+  const content = { description: role?.description ?? '', personality: role?.personality ?? null };
+  return createHash('sha256').update(canonicalJSON(content)).digest('hex').slice(0, 16);
+};
+
+const loadVersionState = async (): Promise<VersionState> => {
   try {
-    void _req;
-    const content = await fs.readFile(ROLES_PATH, 'utf8');
-    const data = JSON.parse(content);
-    return Response.json(Array.isArray(data) ? data : [], { status: 200 });
+    const state = JSON.parse(await fs.readFile(VERSIONS_PATH, 'utf8'));
+    if (state && typeof state.version === 'number' && typeof state.epoch === 'string') return state;
+  } catch {
+    // missing or invalid sidecar: start a new version history
+  }
+  return { entries: {}, epoch: randomUUID(), tombstones: {}, version: 0 };
+};
+
+// cache keyed by roles.json mtime/size so repeated reads skip re-hashing
+type Snapshot = { hashes: Map<string, string>; key: string; list: any[]; state: VersionState };
+
+let snapshot: Snapshot | null = null;
+let pending: Promise<unknown> = Promise.resolve();
+
+/**
+ * Versions are assigned lazily on read: any role whose content hash differs from the last one
+ * seen (or that appeared/disappeared) gets the next version, whichever route or editor changed it.
+ */
+const loadVersionedRoles = async (): Promise<Snapshot> => {
+  const run = pending.then(async () => {
+    const stat = await fs.stat(ROLES_PATH);
+    const key = `${stat.mtimeMs}:${stat.size}`;
+    if (snapshot?.key === key) return snapshot;
+
+    const data = JSON.parse(await fs.readFile(ROLES_PATH, 'utf8'));
+    const list: any[] = Array.isArray(data) ? data : [];
+    const state = snapshot?.state ?? (await loadVersionState());
+    const next = state.version + 1;
+    const hashes = new Map<string, string>();
+    let changed = false;
+
+    for (const role of list) {
+      const id = String(role.role_id);
+      const hash = hashRole(role);
+      hashes.set(id, hash);
+      const name = String(role.name);
+      const prev = state.entries[id];
+      if (prev?.hash !== hash || prev?.name !== name) {
+        state.entries[id] = { hash, name, version: next };
+        delete state.tombstones[id];
+        changed = true;
+      }
+    }
+    for (const id of Object.keys(state.entries)) {
+      if (!hashes.has(id)) {
+        delete state.entries[id];
+        state.tombstones[id] = next;
+        changed = true;
+      }
+    }
+    if (changed) {
+      state.version = next;
+      try {
+        await fs.writeFile(VERSIONS_PATH, JSON.stringify(state), 'utf8');
+      } catch (e) {
+        // read-only or locked storage: keep serving from memory; after a restart the sidecar is
+        // missing, a new epoch starts and clients are told to reset
+        console.warn('[roles] failed to persist roles.versions.json:', e);
+      }
+    }
+
+    snapshot = { hashes, key, list, state };
+    return snapshot;
+  });
+  pending = run.catch(() => undefined);
+  return run;
+};
+
+const project = (role: any, fields: string[] | null, hash: string | undefined) => {
+  if (!fields) return role;
+  const out: Record<string, any> = {};
+  for (const f of fields) {
+    if (f === 'hash') out.hash = hash;
+    else if (f in role) out[f] = role[f];
+  }
+  return out;
+};
+
+/**
+ * GET /webapi/roles
+ * - `fields=role_id,name,hash` returns only the listed fields (`hash` is a content hash of
+ *   description + personality)
+ * - `since=<version>&epoch=<epoch>` returns `{ epoch, version, roles, deleted }` with only roles
+ *   changed after that version; `reset: true` with the full list when the client's version is
+ *   unknown to the server or belongs to another version history (epoch)
+ * - the current version and epoch are always sent in the `X-Roles-Version` / `X-Roles-Epoch` headers
+ */
+export async function GET(req: NextRequest) {
+  try {
+    const { searchParams } = new URL(req.url);
+    const fieldsParam = searchParams.get('fields');
+    const fields = fieldsParam
+      ? fieldsParam
+          .split(',')
+          .map((f) => f.trim())
+          .filter(Boolean)
+      : null;
+    const sinceParam = searchParams.get('since');
+    const epochParam = searchParams.get('epoch');
+
+    const { hashes, list, state } = await loadVersionedRoles();
+    const headers = { 'X-Roles-Epoch': state.epoch, 'X-Roles-Version': String(state.version) };
+    const view = (role: any) => project(role, fields, hashes.get(String(role.role_id)));
+
+    if (sinceParam === null) return jsonResponse(req, list.map(view), headers);
+
+    const since = Number(sinceParam);
+    if (!Number.isFinite(since) || since < 0) {
+      return Response.json({ message: 'since must be a non-negative number' }, { status: 400 });
+    }
+    // since=0 needs no shared history; any other version is only meaningful within its epoch
+    const foreignEpoch = since > 0 && epochParam !== state.epoch;
+    if (since > state.version || foreignEpoch) {
+      return jsonResponse(
+        req,
+        {
+          deleted: [],
+          epoch: state.epoch,
+          reset: true,
+          roles: list.map(view),
+          version: state.version,
+        },
+        headers,
+      );
+    }
+
+    const roles = list.filter((r) => (state.entries[String(r.role_id)]?.version ?? 0) > since);
+    const deleted = Object.entries(state.tombstones)
+      .filter(([, v]) => v > since)
+      .map(([id]) => Number(id));
+
+    return jsonResponse(
+      req,
+      { deleted, epoch: state.epoch, roles: roles.map(view), version: state.version },
+      headers,
+    );
   } catch (e: any) {
     return Response.json(
       { error: e?.message, message: 'Failed to load roles.json' },